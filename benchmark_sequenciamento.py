@@ -0,0 +1,245 @@
+"""
+Bancada de desempenho do sequenciamento: gera DNA e painéis de doenças sintéticos a partir de
+uma semente fixa e mede os motores de correspondência e as formas de execução, gravando as
+curvas de escalabilidade em CSV:
+
+- dna: tempo de cada motor em função do tamanho do DNA
+- genes: tempo de cada motor em função da quantidade de doenças (e de genes)
+- nucleos: tempo do programa completo em cada forma de execução em função dos trabalhadores
+
+O motor "busca" é a avaliação gene a gene por encontrar_ocorrencias_gene, a curva a comparar
+quando essa função muda. Com o CSV já existente as linhas são acrescentadas, e o rótulo
+(--rotulo) separa as execuções de versões diferentes.
+
+Uso: python3 benchmark_sequenciamento.py resultados.csv [opções]
+"""
+import time
+from typing import List, Tuple
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import random
+import subprocess
+import sys
+import tempfile
+
+import victorbenevides_202100011889_sequenciamento as sequenciamento
+
+BASES = "ACGT"
+
+# Programa principal, executado como subprocesso na curva de núcleos
+PROGRAMA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "victorbenevides_202100011889_sequenciamento.py")
+
+CAMPOS_CSV = ["rotulo", "curva", "motor", "execucao", "trabalhadores", "tamanho_dna", "doencas",
+              "genes_unicos", "semente", "segundos"]
+
+
+def gerar_dna(gerador: random.Random, tamanho: int, repeticao: float) -> str:
+    """
+    DNA aleatório gerado em blocos de 4 a 64 bases. Com probabilidade `repeticao`, um bloco
+    copia um trecho já gerado em vez de sortear bases, o que cria repetições no DNA.
+    """
+    bases = []
+    while len(bases) < tamanho:
+        tamanho_bloco = gerador.randint(4, 64)
+        if bases and gerador.random() < repeticao:
+            inicio = gerador.randrange(len(bases))
+            bases.extend(bases[inicio:inicio + tamanho_bloco])
+        else:
+            bases.extend(gerador.choices(BASES, k=tamanho_bloco))
+    return "".join(bases[:tamanho])
+
+
+def gerar_painel(gerador: random.Random, sequencia_dna: str, numero_doencas: int, genes_por_doenca: int,
+                 tamanho_gene: float, desvio_gene: float, fracao_presentes: float) -> List[str]:
+    """
+    Linhas de doenças no formato da entrada. O tamanho de cada gene segue uma normal (mínimo 1)
+    e uma fração dos genes é copiada do DNA, para que parte deles esteja presente.
+    """
+    linhas = []
+    for indice in range(numero_doencas):
+        genes = []
+        for _ in range(genes_por_doenca):
+            tamanho = max(1, round(gerador.gauss(tamanho_gene, desvio_gene)))
+            if sequencia_dna and gerador.random() < fracao_presentes:
+                tamanho = min(tamanho, len(sequencia_dna))
+                inicio = gerador.randrange(len(sequencia_dna) - tamanho + 1)
+                genes.append(sequencia_dna[inicio:inicio + tamanho])
+            else:
+                genes.append("".join(gerador.choices(BASES, k=tamanho)))
+        linhas.append(f"D{indice:05d} {len(genes)} {' '.join(genes)}")
+    return linhas
+
+
+def gerar_caso(argumentos, tamanho_dna: int, numero_doencas: int) -> Tuple[str, List[str]]:
+    """DNA e painel de uma configuração, sempre os mesmos para a mesma semente"""
+    gerador = random.Random(f"{argumentos.semente}:{tamanho_dna}:{numero_doencas}")
+    sequencia_dna = gerar_dna(gerador, tamanho_dna, argumentos.repeticao)
+    linhas_doencas = gerar_painel(gerador, sequencia_dna, numero_doencas, argumentos.genes_por_doenca,
+                                  argumentos.tamanho_gene, argumentos.desvio_gene, argumentos.fracao_presentes)
+    return sequencia_dna, linhas_doencas
+
+
+def escrever_entrada(caminho: str, tamanho_minimo_substring: int, sequencia_dna: str, linhas_doencas: List[str]):
+    """Grava um caso no formato do arquivo de entrada do programa"""
+    with open(caminho, "w") as arquivo:
+        arquivo.write(f"{tamanho_minimo_substring}\n{sequencia_dna}\n{len(linhas_doencas)}\n")
+        arquivo.writelines(f"{linha}\n" for linha in linhas_doencas)
+
+
+def medir_motor(motor: str, sequencia_dna: str, linhas_doencas: List[str], tamanho_minimo_substring: int,
+                repeticoes: int) -> Tuple[float, int]:
+    """
+    Melhor tempo, entre as repetições, da avaliação dos genes únicos do painel pelo motor,
+    incluindo a construção do índice do DNA quando o motor usa um
+    """
+    genes_unicos, _ = sequenciamento.deduplicar_genes(linhas_doencas)
+    avaliar_genes = sequenciamento.MOTORES[motor]
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        indice = sequenciamento.preparar_indice(motor, sequencia_dna, None, genes_unicos)
+        avaliar_genes(sequencia_dna, genes_unicos, tamanho_minimo_substring, None, indice)
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor, len(genes_unicos)
+
+
+def medir_execucao(caminho_entrada: str, motor: str, execucao: str, trabalhadores: int, repeticoes: int) -> float:
+    """Melhor tempo total (medido pelo próprio programa, via --metricas) de uma forma de execução"""
+    melhor = float("inf")
+    with tempfile.TemporaryDirectory() as diretorio:
+        caminho_saida = os.path.join(diretorio, "saida.txt")
+        caminho_metricas = os.path.join(diretorio, "metricas.json")
+        for _ in range(repeticoes):
+            subprocess.run([sys.executable, PROGRAMA, caminho_entrada, caminho_saida, "--motor", motor,
+                            "--execucao", execucao, "--trabalhadores", str(trabalhadores),
+                            "--metricas", caminho_metricas], check=True, stdout=subprocess.DEVNULL)
+            with open(caminho_metricas) as arquivo:
+                melhor = min(melhor, json.load(arquivo)["tempo_total"])
+    return melhor
+
+
+def curva_dna(argumentos) -> List[dict]:
+    linhas = []
+    for tamanho_dna in argumentos.tamanhos_dna:
+        sequencia_dna, linhas_doencas = gerar_caso(argumentos, tamanho_dna, argumentos.doencas[0])
+        for motor in argumentos.motores:
+            segundos, genes_unicos = medir_motor(motor, sequencia_dna, linhas_doencas,
+                                                 argumentos.tamanho_minimo, argumentos.repeticoes)
+            linhas.append({"curva": "dna", "motor": motor, "tamanho_dna": tamanho_dna,
+                           "doencas": len(linhas_doencas), "genes_unicos": genes_unicos, "segundos": segundos})
+    return linhas
+
+
+def curva_genes(argumentos) -> List[dict]:
+    linhas = []
+    for numero_doencas in argumentos.doencas:
+        sequencia_dna, linhas_doencas = gerar_caso(argumentos, argumentos.tamanhos_dna[0], numero_doencas)
+        for motor in argumentos.motores:
+            segundos, genes_unicos = medir_motor(motor, sequencia_dna, linhas_doencas,
+                                                 argumentos.tamanho_minimo, argumentos.repeticoes)
+            linhas.append({"curva": "genes", "motor": motor, "tamanho_dna": len(sequencia_dna),
+                           "doencas": numero_doencas, "genes_unicos": genes_unicos, "segundos": segundos})
+    return linhas
+
+
+def curva_nucleos(argumentos) -> List[dict]:
+    """Usa o maior DNA e o maior painel, para que o trabalho compense a paralelização"""
+    sequencia_dna, linhas_doencas = gerar_caso(argumentos, max(argumentos.tamanhos_dna), max(argumentos.doencas))
+    genes_unicos, _ = sequenciamento.deduplicar_genes(linhas_doencas)
+    linhas = []
+    with tempfile.TemporaryDirectory() as diretorio:
+        caminho_entrada = os.path.join(diretorio, "entrada.txt")
+        escrever_entrada(caminho_entrada, argumentos.tamanho_minimo, sequencia_dna, linhas_doencas)
+        for execucao in sequenciamento.EXECUCOES:
+            for trabalhadores in (argumentos.nucleos if execucao != "serial" else [1]):
+                segundos = medir_execucao(caminho_entrada, argumentos.motor_execucao, execucao, trabalhadores,
+                                          argumentos.repeticoes)
+                linhas.append({"curva": "nucleos", "motor": argumentos.motor_execucao, "execucao": execucao,
+                               "trabalhadores": trabalhadores, "tamanho_dna": len(sequencia_dna),
+                               "doencas": len(linhas_doencas), "genes_unicos": len(genes_unicos),
+                               "segundos": segundos})
+    return linhas
+
+
+CURVAS = {
+    "dna": curva_dna,
+    "genes": curva_genes,
+    "nucleos": curva_nucleos,
+}
+
+
+def gravar_csv(caminho: str, linhas: List[dict]):
+    """Acrescenta as linhas ao CSV, escrevendo o cabeçalho apenas em um arquivo novo"""
+    novo = not os.path.exists(caminho) or os.path.getsize(caminho) == 0
+    with open(caminho, "a", newline="") as arquivo:
+        escritor = csv.DictWriter(arquivo, fieldnames=CAMPOS_CSV, restval="")
+        if novo:
+            escritor.writeheader()
+        escritor.writerows(linhas)
+
+
+def ler_argumentos():
+    """Interpreta a linha de comando"""
+    motores_disponiveis = sorted(motor for motor in sequenciamento.MOTORES if motor != "numpy" or sequenciamento.np)
+    parser = argparse.ArgumentParser(description="Curvas de desempenho do sequenciamento com dados sintéticos")
+    parser.add_argument("saida", help="arquivo CSV de resultados (as linhas são acrescentadas)")
+    parser.add_argument("--curvas", nargs="+", choices=sorted(CURVAS), default=sorted(CURVAS),
+                        help="curvas a medir (padrão: todas)")
+    parser.add_argument("--motores", nargs="+", choices=sorted(sequenciamento.MOTORES), default=motores_disponiveis,
+                        help="motores medidos nas curvas de DNA e de genes (padrão: todos os disponíveis)")
+    parser.add_argument("--semente", type=int, default=0, help="semente do gerador (padrão: 0)")
+    parser.add_argument("--tamanhos-dna", nargs="+", type=int, default=[2500, 5000, 10000, 20000], metavar="N",
+                        help="tamanhos do DNA; o primeiro é usado na curva de genes")
+    parser.add_argument("--doencas", nargs="+", type=int, default=[10, 20, 40, 80], metavar="N",
+                        help="quantidades de doenças; a primeira é usada na curva de DNA")
+    parser.add_argument("--genes-por-doenca", type=int, default=20, metavar="N")
+    parser.add_argument("--tamanho-gene", type=float, default=30, metavar="MEDIA",
+                        help="tamanho médio dos genes (distribuição normal)")
+    parser.add_argument("--desvio-gene", type=float, default=10, metavar="DESVIO",
+                        help="desvio padrão do tamanho dos genes")
+    parser.add_argument("--fracao-presentes", type=float, default=0.5, metavar="F",
+                        help="fração dos genes copiada do DNA (padrão: 0.5)")
+    parser.add_argument("--repeticao", type=float, default=0.0, metavar="P",
+                        help="probabilidade de cada bloco do DNA repetir um trecho anterior (padrão: 0)")
+    parser.add_argument("--tamanho-minimo", type=int, default=20, metavar="N",
+                        help="tamanho_minimo_substring dos casos gerados (padrão: 20)")
+    parser.add_argument("--nucleos", nargs="+", type=int, default=list(range(1, multiprocessing.cpu_count() + 1)),
+                        metavar="N", help="números de trabalhadores da curva de núcleos (padrão: 1 a cpu_count)")
+    parser.add_argument("--motor-execucao", choices=sorted(sequenciamento.MOTORES), default="busca",
+                        help="motor usado na curva de núcleos (padrão: busca, que é distribuída)")
+    parser.add_argument("--repeticoes", type=int, default=3, metavar="R",
+                        help="repetições de cada medida; vale o menor tempo (padrão: 3)")
+    parser.add_argument("--rotulo", default="", help="rótulo gravado em cada linha, para comparar versões")
+    argumentos = parser.parse_args()
+    if argumentos.repeticoes < 1:
+        parser.error("--repeticoes deve ser maior que zero")
+    if min(argumentos.tamanhos_dna + argumentos.doencas + argumentos.nucleos) < 1:
+        parser.error("tamanhos do DNA, doenças e núcleos devem ser maiores que zero")
+    if "numpy" in argumentos.motores and sequenciamento.np is None:
+        parser.error("o motor numpy requer o pacote numpy")
+    return argumentos
+
+
+def main():
+    argumentos = ler_argumentos()
+
+    tempo_inicio = time.time()
+
+    for curva in argumentos.curvas:
+        linhas = CURVAS[curva](argumentos)
+        for linha in linhas:
+            linha.update(rotulo=argumentos.rotulo, semente=argumentos.semente)
+            print(f"{linha['curva']:8} {linha['motor']:13} {linha.get('execucao', ''):10} "
+                  f"{linha.get('trabalhadores', ''):>3} dna={linha['tamanho_dna']:<8} "
+                  f"genes={linha['genes_unicos']:<6} {linha['segundos']:.6f} segundos")
+        gravar_csv(argumentos.saida, linhas)
+
+    tempo_fim = time.time()
+    print(f"Tempo de execução: {tempo_fim - tempo_inicio:.6f} segundos")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,314 @@
+"""
+Oráculo diferencial dos motores de correspondência: gera casos aleatórios e adversariais
+(sequências periódicas, genes sobrepostos, genes nos limites de tamanho dos motores, limites
+exatos de tamanho_minimo_substring) e compara o conjunto de genes presentes de cada motor com a
+referência ingênua, uma cópia autocontida do laço original de busca gene a gene (e não o
+código de produção, que os motores compartilham). Cada motor que indexa o DNA também é
+verificado com o índice pronto, os que usam o diretório de cache com o índice gravado e
+relido, os que trabalham sobre o arquivo mapeado também sobre uma SequenciaMapeada, e o
+painel compilado com o autômato e com o artefato relido do disco.
+
+Um caso que falha é minimizado (genes, DNA, cada gene e o tamanho mínimo reduzidos enquanto a
+falha persistir) antes de ser relatado, e pode ser gravado no formato da entrada do programa.
+
+Uso: python3 oraculo_sequenciamento.py [opções]
+"""
+import time
+from typing import Callable, Dict, List, Set, Tuple
+import argparse
+import os
+import random
+import sys
+import tempfile
+
+import victorbenevides_202100011889_sequenciamento as sequenciamento
+
+BASES = "ACGT"
+
+Caso = Tuple[str, List[str], int]  # (sequencia_dna, genes, tamanho_minimo_substring)
+
+
+# Motores cujo índice é gravado e relido do diretório de cache; os demais o ignoram
+MOTORES_COM_CACHE = {"sufixos", "fm"}
+
+
+def gene_presente(sequencia_dna: str, gene: str, tamanho_minimo_substring: int) -> bool:
+    """
+    Cópia do laço original de encontrar_ocorrencias_gene: a referência não pode depender do
+    código de produção, senão uma regressão nele mudaria a referência e os motores juntos
+    """
+    if not gene or not sequencia_dna:
+        return False
+
+    contagem = 0
+    inicio = 0
+    while inicio <= len(sequencia_dna) - len(gene):
+        posicao = sequencia_dna.find(gene, inicio)
+        if posicao == -1:
+            break
+
+        contagem += len(gene)
+        if contagem >= tamanho_minimo_substring:
+            return True
+
+        inicio = posicao + 1
+
+    return False
+
+
+def referencia(sequencia_dna: str, genes: List[str], tamanho_minimo_substring: int) -> Set[str]:
+    """Genes presentes pela semântica original, gene a gene"""
+    return {gene for gene in genes if gene_presente(sequencia_dna, gene, tamanho_minimo_substring)}
+
+
+def avaliar_com_indice(motor: str, sequencia_dna: str, genes: List[str], tamanho_minimo_substring: int) -> Set[str]:
+    """Motor com o índice construído antes, como no programa principal"""
+    indice = sequenciamento.preparar_indice(motor, sequencia_dna, None, genes)
+    return sequenciamento.MOTORES[motor](sequencia_dna, genes, tamanho_minimo_substring, None, indice)
+
+
+def avaliar_com_cache(motor: str, sequencia_dna: str, genes: List[str], tamanho_minimo_substring: int) -> Set[str]:
+    """Motor com o índice gravado no diretório de cache e relido na segunda avaliação"""
+    with tempfile.TemporaryDirectory() as diretorio_cache:
+        for _ in range(2):
+            indice = sequenciamento.preparar_indice(motor, sequencia_dna, diretorio_cache, genes)
+            presentes = sequenciamento.MOTORES[motor](sequencia_dna, genes, tamanho_minimo_substring,
+                                                      diretorio_cache, indice)
+    return presentes
+
+
+def avaliar_mapeado(motor: str, sequencia_dna: str, genes: List[str], tamanho_minimo_substring: int) -> Set[str]:
+    """Motor sobre a sequência mapeada de um arquivo, sem decodificá-la, como no programa principal"""
+    with tempfile.TemporaryDirectory() as diretorio:
+        caminho = os.path.join(diretorio, "sequencia.txt")
+        with open(caminho, "wb") as arquivo:
+            # Um byte antes da sequência: o mapeamento não aceita arquivos vazios
+            arquivo.write(b"\n" + sequencia_dna.encode("ascii"))
+        sequencia = sequenciamento.SequenciaMapeada(caminho, 1, 1 + len(sequencia_dna))
+        indice = sequenciamento.preparar_indice(motor, sequencia, None, genes)
+        return sequenciamento.MOTORES[motor](sequencia, genes, tamanho_minimo_substring, None, indice)
+
+
+def avaliar_varredura_rabin_karp(sequencia_dna: str, genes: List[str], tamanho_minimo_substring: int) -> Set[str]:
+    """Rabin-Karp com a varredura rolante em todos os tamanhos (os casos têm poucos genes por tamanho)"""
+    genes = [gene for gene in dict.fromkeys(genes) if gene]
+    limites = [sequenciamento.ocorrencias_necessarias(gene, tamanho_minimo_substring) for gene in genes]
+    contagens = sequenciamento.contar_rabin_karp(sequencia_dna, genes, limites, genes_minimos=1)
+    return {gene for gene, contagem, limite in zip(genes, contagens, limites) if contagem >= limite}
+
+
+def avaliar_por_painel(sequencia_dna: str, genes: List[str], tamanho_minimo_substring: int,
+                       artefato: bool = False) -> Set[str]:
+    """Genes presentes pelo painel compilado (opcionalmente gravado e relido como artefato)"""
+    painel = sequenciamento.compilar_painel(tamanho_minimo_substring, [f"D0 {len(genes)} {' '.join(genes)}"])
+    if artefato:
+        with tempfile.TemporaryDirectory() as diretorio:
+            caminho = os.path.join(diretorio, "painel.bin")
+            painel.salvar(caminho)
+            painel = sequenciamento.PainelCompilado.carregar(caminho)
+    presentes = sequenciamento.avaliar_painel(painel, sequencia_dna)
+    return {gene for gene, presente in zip(painel.genes, presentes) if presente}
+
+
+def montar_variantes(motores: List[str]) -> Dict[str, Callable[[str, List[str], int], Set[str]]]:
+    """Cada forma de avaliação verificada: os motores, seus índices e o painel compilado"""
+    variantes = {}
+    for motor in motores:
+        variantes[motor] = sequenciamento.MOTORES[motor]
+        if motor in sequenciamento.INDICES_MOTORES:
+            variantes[f"{motor}+indice"] = lambda *caso, motor=motor: avaliar_com_indice(motor, *caso)
+        if motor in MOTORES_COM_CACHE:
+            variantes[f"{motor}+cache"] = lambda *caso, motor=motor: avaliar_com_cache(motor, *caso)
+        if motor in sequenciamento.MOTORES_MAPEADOS:
+            variantes[f"{motor}+mapeado"] = lambda *caso, motor=motor: avaliar_mapeado(motor, *caso)
+    if "rabin-karp" in motores:
+        variantes["rabin-karp+varredura"] = avaliar_varredura_rabin_karp
+    variantes["painel"] = avaliar_por_painel
+    variantes["painel+artefato"] = lambda *caso: avaliar_por_painel(*caso, artefato=True)
+    return variantes
+
+
+def diferenca(variante: Callable, caso: Caso) -> str:
+    """Descrição da divergência entre a variante e a referência no caso, ou "" se concordarem"""
+    esperado = referencia(*caso)
+    try:
+        obtido = set(variante(*caso))
+    except Exception as erro:
+        return f"exceção {type(erro).__name__}: {erro}"
+    if obtido == esperado:
+        return ""
+    return f"a mais: {sorted(obtido - esperado)}, faltando: {sorted(esperado - obtido)}"
+
+
+def sequencia_aleatoria(gerador: random.Random, tamanho: int, alfabeto: str = BASES) -> str:
+    return "".join(gerador.choices(alfabeto, k=tamanho))
+
+
+def caso_aleatorio(gerador: random.Random, tamanho_maximo_dna: int) -> Caso:
+    """DNA aleatório, genes copiados dele (presentes) ou sorteados, de tamanhos variados"""
+    alfabeto = gerador.choice([BASES, BASES, "AC", "A", BASES + "N"])
+    sequencia_dna = sequencia_aleatoria(gerador, gerador.randint(0, tamanho_maximo_dna), alfabeto)
+    genes = []
+    for _ in range(gerador.randint(1, 12)):
+        tamanho = gerador.choice([gerador.randint(1, 8), gerador.randint(1, 40), gerador.randint(1, 100)])
+        if sequencia_dna and gerador.random() < 0.6:
+            inicio = gerador.randrange(len(sequencia_dna))
+            genes.append(sequencia_dna[inicio:inicio + tamanho])
+        else:
+            genes.append(sequencia_aleatoria(gerador, tamanho, alfabeto))
+    return sequencia_dna, genes, gerador.randint(0, 60)
+
+
+def caso_periodico(gerador: random.Random, tamanho_maximo_dna: int) -> Caso:
+    """DNA periódico e genes formados pelo mesmo período: muitas ocorrências sobrepostas"""
+    periodo = sequencia_aleatoria(gerador, gerador.randint(1, 4))
+    sequencia_dna = (periodo * tamanho_maximo_dna)[:gerador.randint(1, tamanho_maximo_dna)]
+    genes = [(periodo * 40)[deslocamento:deslocamento + gerador.randint(1, 70)]
+             for deslocamento in (gerador.randrange(len(periodo)) for _ in range(gerador.randint(1, 8)))]
+    return sequencia_dna, genes, gerador.randint(0, 3 * len(sequencia_dna) + 1)
+
+
+def caso_limite_ocorrencias(gerador: random.Random, tamanho_maximo_dna: int) -> Caso:
+    """Tamanho mínimo exatamente em k × len(gene) ou ao lado, para um gene com k ocorrências"""
+    gene = sequencia_aleatoria(gerador, gerador.randint(1, 20))
+    ocorrencias = gerador.randint(1, 5)
+    partes = [sequencia_aleatoria(gerador, gerador.randint(0, 10)) for _ in range(ocorrencias + 1)]
+    sequencia_dna = gene.join(partes)[:max(tamanho_maximo_dna, len(gene))]
+    tamanho_minimo_substring = ocorrencias * len(gene) + gerador.choice([-1, 0, 1])
+    return sequencia_dna, [gene, gene[:-1] or gene, gene + gene], max(0, tamanho_minimo_substring)
+
+
+def caso_tamanhos_limite(gerador: random.Random, tamanho_maximo_dna: int) -> Caso:
+    """Genes nos tamanhos em que os motores mudam de estratégia (trie, k-mers, inteiros de bits)"""
+    limites = [sequenciamento.PROFUNDIDADE_MAXIMA_AUTOMATO, sequenciamento.TAMANHO_MAXIMO_BITPARALELO,
+               sequenciamento.K_MAXIMO_KMERS]
+    sequencia_dna = sequencia_aleatoria(gerador, gerador.randint(1, max(tamanho_maximo_dna, 200)))
+    genes = []
+    for limite in limites:
+        for tamanho in (limite - 1, limite, limite + 1):
+            inicio = gerador.randrange(max(1, len(sequencia_dna) - tamanho + 1))
+            genes.append(sequencia_dna[inicio:inicio + tamanho])
+    genes.append(sequencia_dna)
+    genes.append(sequencia_dna + "A")
+    genes.append("")
+    genes.append(genes[0])  # Gene repetido
+    return sequencia_dna, genes, gerador.randint(0, 2 * sequenciamento.TAMANHO_MAXIMO_BITPARALELO)
+
+
+GERADORES = [caso_aleatorio, caso_aleatorio, caso_periodico, caso_limite_ocorrencias, caso_tamanhos_limite]
+
+
+def reduzir_texto(texto: str, falha: Callable[[str], bool]) -> str:
+    """Remove trechos do texto, dos maiores aos menores, enquanto a falha persistir"""
+    pedaco = len(texto) // 2
+    while pedaco >= 1:
+        inicio = 0
+        while inicio < len(texto):
+            candidato = texto[:inicio] + texto[inicio + pedaco:]
+            if falha(candidato):
+                texto = candidato
+            else:
+                inicio += pedaco
+        pedaco //= 2
+    return texto
+
+
+def minimizar(variante: Callable, caso: Caso) -> Caso:
+    """Reduz um caso que falha: genes, DNA, cada gene e o tamanho mínimo, sempre mantendo a falha"""
+    sequencia_dna, genes, tamanho_minimo_substring = caso
+
+    def falha(sequencia_dna, genes, tamanho_minimo_substring):
+        return bool(diferenca(variante, (sequencia_dna, genes, tamanho_minimo_substring)))
+
+    # O DNA e os genes dependem um do outro (um gene presente precisa continuar no DNA), então
+    # as reduções se repetem até nenhuma delas avançar
+    anterior = None
+    while anterior != (sequencia_dna, genes, tamanho_minimo_substring):
+        anterior = (sequencia_dna, list(genes), tamanho_minimo_substring)
+
+        indice = 0
+        while indice < len(genes):
+            candidatos = genes[:indice] + genes[indice + 1:]
+            if candidatos and falha(sequencia_dna, candidatos, tamanho_minimo_substring):
+                genes = candidatos
+            else:
+                indice += 1
+
+        # Atalho: o próprio gene como DNA
+        for gene in genes:
+            if len(gene) < len(sequencia_dna) and falha(gene, genes, tamanho_minimo_substring):
+                sequencia_dna = gene
+        sequencia_dna = reduzir_texto(sequencia_dna, lambda texto: falha(texto, genes, tamanho_minimo_substring))
+        for indice in range(len(genes)):
+            genes[indice] = reduzir_texto(
+                genes[indice],
+                lambda texto: falha(sequencia_dna, genes[:indice] + [texto] + genes[indice + 1:],
+                                    tamanho_minimo_substring))
+
+        while tamanho_minimo_substring > 0 and falha(sequencia_dna, genes, tamanho_minimo_substring - 1):
+            tamanho_minimo_substring -= 1
+    return sequencia_dna, genes, tamanho_minimo_substring
+
+
+def gravar_caso(caminho: str, caso: Caso):
+    """Grava o caso no formato da entrada do programa, com todos os genes em uma única doença"""
+    sequencia_dna, genes, tamanho_minimo_substring = caso
+    genes = [gene for gene in genes if gene]
+    with open(caminho, "w") as arquivo:
+        arquivo.write(f"{tamanho_minimo_substring}\n{sequencia_dna}\n1\nD0 {len(genes)} {' '.join(genes)}\n")
+
+
+def ler_argumentos():
+    """Interpreta a linha de comando"""
+    motores_disponiveis = sorted(motor for motor in sequenciamento.MOTORES if motor != "numpy" or sequenciamento.np)
+    parser = argparse.ArgumentParser(description="Oráculo diferencial dos motores de correspondência")
+    parser.add_argument("--casos", type=int, default=500, metavar="N", help="casos gerados (padrão: 500)")
+    parser.add_argument("--semente", type=int, default=0, help="semente do gerador (padrão: 0)")
+    parser.add_argument("--tamanho-maximo-dna", type=int, default=120, metavar="N",
+                        help="tamanho máximo do DNA dos casos aleatórios (padrão: 120)")
+    parser.add_argument("--motores", nargs="+", choices=sorted(sequenciamento.MOTORES), default=motores_disponiveis,
+                        help="motores verificados (padrão: todos os disponíveis)")
+    parser.add_argument("--falhas", metavar="DIRETORIO",
+                        help="grava cada caso minimizado no formato da entrada neste diretório")
+    argumentos = parser.parse_args()
+    if argumentos.casos < 1 or argumentos.tamanho_maximo_dna < 1:
+        parser.error("--casos e --tamanho-maximo-dna devem ser maiores que zero")
+    if "numpy" in argumentos.motores and sequenciamento.np is None:
+        parser.error("o motor numpy requer o pacote numpy")
+    return argumentos
+
+
+def main():
+    argumentos = ler_argumentos()
+
+    tempo_inicio = time.time()
+
+    variantes = montar_variantes(argumentos.motores)
+    gerador = random.Random(argumentos.semente)
+    falhas: Dict[str, Caso] = {}  # Primeira falha (minimizada) de cada variante
+
+    for numero in range(argumentos.casos):
+        caso = GERADORES[numero % len(GERADORES)](gerador, argumentos.tamanho_maximo_dna)
+        for nome, variante in variantes.items():
+            if nome not in falhas and diferenca(variante, caso):
+                falhas[nome] = minimizar(variante, (caso[0], list(caso[1]), caso[2]))
+
+    for nome in variantes:
+        if nome not in falhas:
+            print(f"{nome:22} ok")
+            continue
+        caso = falhas[nome]
+        print(f"{nome:22} FALHA: {diferenca(variantes[nome], caso)}")
+        print(f"{'':22} tamanho_minimo_substring={caso[2]} dna={caso[0]!r} genes={caso[1]!r}")
+        if argumentos.falhas:
+            os.makedirs(argumentos.falhas, exist_ok=True)
+            gravar_caso(os.path.join(argumentos.falhas, f"falha_{nome}.txt"), caso)
+
+    print(f"Casos: {argumentos.casos}, variantes com falha: {len(falhas)} de {len(variantes)}")
+    tempo_fim = time.time()
+    print(f"Tempo de execução: {tempo_fim - tempo_inicio:.6f} segundos")
+    sys.exit(1 if falhas else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,114 @@
 import time
+from array import array
+from contextlib import contextmanager
+from bisect import bisect_left, bisect_right
 from dataclasses import dataclass
-from typing import List
+from functools import partial
+from heapq import heappush, heapreplace
+from itertools import accumulate, islice
+from multiprocessing.pool import ThreadPool
+from typing import Dict, Iterable, Iterator, List, Set, Tuple
+import argparse
+import hashlib
+import json
+import struct
+import mmap
 import multiprocessing
 import math
+import os
+import re
+import shutil
+import signal
+import socket
+import socketserver
+import stat
 import sys
+import tempfile
+import threading
+
+try:
+    import numpy as np
+except ImportError:  # Opcional: só o motor numpy depende dele
+    np = None
+
+try:
+    import resource
+except ImportError:  # Indisponível fora do Unix: as métricas saem sem o pico de memória
+    resource = None
+
+# Profundidade máxima do trie do Aho-Corasick: genes mais longos entram apenas com o prefixo
+# e cada ocorrência do prefixo é confirmada contra o gene completo na sequência
+PROFUNDIDADE_MAXIMA_AUTOMATO = 32
+
+# Probabilidades são inteiros de 0 a 100, o que permite ordenar por baldes
+PROBABILIDADE_MAXIMA = 100
+
+# Intervalo entre as contagens amostradas do índice FM: maior = menos memória, buscas mais lentas
+AMOSTRAGEM_FM = 64
+_CABECALHO_FM = struct.Struct("<8sqq")
+_ASSINATURA_FM = b"FMPAA1\0\0"
+
+# Artefato do painel compilado: assinatura, tamanho mínimo, bytes dos códigos e dos genes,
+# quantidade de doenças, genes, índices de genes, nós do autômato, largura da sua tabela de
+# transições (símbolos + 1) e genes terminais
+_CABECALHO_PAINEL = struct.Struct("<8sqqqqqqqqq")
+_ASSINATURA_PAINEL = b"PAINEL3\0"
+
+# Genes até este tamanho são casados pelo Shift-Or bit-paralelo, vários por inteiro: cada
+# grupo de até BITS_POR_GRUPO_BITPARALELO bits é avaliado em uma única passada pelo DNA
+TAMANHO_MAXIMO_BITPARALELO = 64
+BITS_POR_GRUPO_BITPARALELO = 4096
+
+# Hash polinomial do motor numpy, em aritmética módulo 2^64 (a base é ímpar, logo invertível)
+BASE_HASH = 0x9E3779B97F4A7C15
+INVERSO_BASE_HASH = pow(BASE_HASH, -1, 1 << 64)
+
+# Hash de Rabin-Karp: módulo primo de Mersenne 2^61 - 1
+BASE_RABIN_KARP = 1_000_003
+MODULO_RABIN_KARP = (1 << 61) - 1
+# A varredura rolante em Python custa por base (~400 ns) o que str.find custa para cerca de 250
+# genes (~1,5 ns por base cada): tamanhos com menos genes que isso são buscados gene a gene
+GENES_MINIMOS_RABIN_KARP = 256
+
+# Maior k aceito pelo índice de k-mers (limita o número de chaves distintas)
+K_MAXIMO_KMERS = 16
+
+# Codificação de 2 bits por base: a base i ocupa os bits 2*(i % 4) do byte i // 4.
+# Caracteres fora de ACGT são codificados como 0 e tratados à parte como exceções.
+CODIGOS_BASES = {"A": 0, "C": 1, "G": 2, "T": 3}
+_TABELA_CODIGOS = bytes(CODIGOS_BASES.get(chr(caractere), 0) for caractere in range(256))
+_TABELA_PALAVRAS = {
+    int.from_bytes(bytes((c0, c1, c2, c3)), sys.byteorder): c0 | c1 << 2 | c2 << 4 | c3 << 6
+    for c0 in range(4) for c1 in range(4) for c2 in range(4) for c3 in range(4)
+}
+# Bases empacotadas por vez (múltiplo de 4), para não copiar a sequência inteira de uma vez
+BLOCO_EMPACOTAMENTO = 1 << 20
+# Menor gene com ao menos um byte empacotado inteiro em todas as 4 fases (3 bases de cabeça + 4)
+TAMANHO_MINIMO_EMPACOTADO = 7
+
+# Partes por trabalhador na busca distribuída: partes menores deixam os trabalhadores ociosos
+# pegarem o trabalho restante em vez de esperar o mais lento
+PARTES_POR_TRABALHADOR = 4
+
+# Modelo de custo da execução, em segundos, com constantes medidas na entrada de exemplo:
+# pontuar custa por byte das linhas de doenças, a busca distribuída por byte do painel por base
+# do DNA, e o pool de processos paga a criação e o envio dos veredictos a cada trabalhador
+EXECUCOES = ("serial", "threads", "processos")
+SEGUNDOS_POR_BYTE_PONTUACAO = 2e-9
+SEGUNDOS_POR_BYTE_BUSCA = 3e-12
+CUSTO_POOL_PROCESSOS = 0.006
+CUSTO_POR_PROCESSO = 0.003
+CUSTO_POR_THREAD = 0.0005
+SEGUNDOS_POR_BYTE_TRANSFERENCIA = 1e-9
+
+# Sequência de DNA mapeada em memória nos processos trabalhadores (ver inicializar_trabalhador)
+_sequencia_compartilhada = None
+_tamanho_minimo_compartilhado = 0
+
+# Painel compilado e configuração dos trabalhadores no modo de vários pacientes
+_painel_compartilhado = None
+_configuracao_pacientes = None
+
 
 @dataclass
 class DNA:
@@ -18,34 +123,1206 @@ class Doenca:
     probabilidade_doenca: int = 0
 
 
-def encontrar_ocorrencias_gene(sequencia_dna: str, gene: str, tamanho_minimo_substring: int) -> bool:
+@dataclass
+class PainelCompilado:
+    """
+    Painel de doenças compilado uma única vez: genes únicos e, para cada doença, os índices
+    dos seus genes em formato CSR (os genes da doença i são indices_genes[inicios[i]:inicios[i + 1]]).
+    """
+    tamanho_minimo_substring: int
+    codigos: List[str]
+    genes: List[str]
+    inicios: array
+    indices_genes: array
+    automato: "AutomatoAhoCorasick" = None
+
+    def salvar(self, caminho: str):
+        """
+        Grava o painel como artefato binário: cabeçalho, códigos e genes (texto separado por
+        quebras de linha), arrays CSR das doenças e as tabelas do autômato. Cada seção é
+        alinhada a 8 bytes para que os arrays possam ser lidos direto do mapeamento.
+        """
+        automato = self.automato
+        tabelas = automato.tabelas() if automato is not None else ()
+        codigos = "\n".join(self.codigos).encode()
+        genes = "\n".join(self.genes).encode()
+        cabecalho = _CABECALHO_PAINEL.pack(
+            _ASSINATURA_PAINEL, self.tamanho_minimo_substring, len(codigos), len(genes), len(self.codigos),
+            len(self.genes), len(self.indices_genes), len(automato.profundidades) if automato else 0,
+            automato.largura if automato else 0, len(automato.terminais) if automato else 0)
+
+        secoes = [codigos, genes, self.inicios.tobytes(), self.indices_genes.tobytes()]
+        secoes.extend(tabela if isinstance(tabela, bytes) else tabela.tobytes() for tabela in tabelas)
+        gravar_arquivo_atomico(caminho, [cabecalho] + [secao + bytes(-len(secao) % 8) for secao in secoes])
+
+    @classmethod
+    def carregar(cls, caminho: str, com_automato: bool = True) -> "PainelCompilado":
+        """
+        Lê um artefato gravado por salvar, mapeado em memória: os arrays CSR e as tabelas do
+        autômato são views do mapeamento, sem cópia
+        """
+        dados = mapear_arquivo(caminho)
+        if len(dados) < _CABECALHO_PAINEL.size or _CABECALHO_PAINEL.unpack_from(dados)[0] != _ASSINATURA_PAINEL:
+            raise ValueError(f"{caminho} não é um painel compilado")
+        (_, tamanho_minimo_substring, bytes_codigos, bytes_genes, numero_doencas, numero_genes,
+         numero_indices, numero_nos, largura, numero_terminais) = _CABECALHO_PAINEL.unpack_from(dados)
+
+        posicao = _CABECALHO_PAINEL.size
+
+        def secao(quantidade: int, formato: str = None):
+            nonlocal posicao
+            tamanho = quantidade * (array(formato).itemsize if formato else 1)
+            trecho = dados[posicao:posicao + tamanho]
+            posicao += tamanho + (-tamanho % 8)
+            return trecho.cast(formato) if formato else trecho
+
+        codigos, genes = str(secao(bytes_codigos), "utf-8"), str(secao(bytes_genes), "utf-8")
+        codigos = codigos.split("\n") if numero_doencas else []
+        genes = genes.split("\n") if numero_genes else []
+        inicios = secao(numero_doencas + 1, "i")
+        indices_genes = secao(numero_indices, "i")
+
+        automato = None
+        if com_automato and numero_nos:
+            automato = AutomatoAhoCorasick.de_tabelas(
+                genes, secao(largura - 1, "i"), secao(numero_nos * largura, "i"), secao(numero_nos, "i"),
+                secao(numero_nos, "i"), secao(numero_nos + 1, "i"), secao(numero_terminais, "i"))
+        return cls(tamanho_minimo_substring, codigos, genes, inicios, indices_genes, automato)
+
+
+def construir_vetor_sufixos(sequencia_dna: str) -> array:
+    """
+    Constrói o vetor de sufixos por duplicação de prefixos: a cada rodada os sufixos são
+    ordenados pelos postos dos 2k primeiros caracteres, até que todos os postos sejam distintos.
+    Cada rodada é uma ordenação radix em O(n): a ordem pelo segundo posto sai do vetor da rodada
+    anterior, e uma ordenação por contagem estável aplica o primeiro posto, em O(n log n) no total.
+    """
+    n = len(sequencia_dna)
+    if n == 0:
+        return array("i")
+
+    alfabeto = {base: posto for posto, base in enumerate(sorted(set(sequencia_dna)))}
+    postos = [alfabeto[base] for base in sequencia_dna]
+    sufixos = sorted(range(n), key=postos.__getitem__)
+    numero_postos = len(alfabeto)
+    k = 1
+    while numero_postos < n:
+        # Ordem pelo segundo posto: primeiro os sufixos sem a segunda metade (posto vazio), depois
+        # os demais na ordem em que a segunda metade já está no vetor de sufixos
+        por_segundo = [*range(n - k, n), *(sufixo - k for sufixo in sufixos if sufixo >= k)]
+
+        # Ordenação por contagem estável pelo primeiro posto
+        contagens = [0] * numero_postos
+        for posto in postos:
+            contagens[posto] += 1
+        inicios = [0, *accumulate(contagens)]
+        for sufixo in por_segundo:
+            posto = postos[sufixo]
+            sufixos[inicios[posto]] = sufixo
+            inicios[posto] += 1
+
+        segundos = postos[k:] + [-1] * k
+        novos_postos = [0] * n
+        posto = 0
+        for anterior, atual in zip(sufixos, islice(sufixos, 1, None)):
+            if postos[atual] != postos[anterior] or segundos[atual] != segundos[anterior]:
+                posto += 1
+            novos_postos[atual] = posto
+        postos = novos_postos
+        numero_postos = posto + 1
+        k *= 2
+
+    return array("i", sufixos)
+
+
+def construir_lcp(sequencia_dna: str, sufixos: array) -> array:
+    """Vetor LCP pelo algoritmo de Kasai: lcp[i] é o maior prefixo comum entre os sufixos i-1 e i"""
+    n = len(sequencia_dna)
+    postos = [0] * n
+    for posicao, sufixo in enumerate(sufixos):
+        postos[sufixo] = posicao
+
+    lcp = array("i", bytes(4 * n))
+    comum = 0
+    for sufixo in range(n):
+        posicao = postos[sufixo]
+        if posicao == 0:
+            comum = 0
+            continue
+        anterior = sufixos[posicao - 1]
+        while sufixo + comum < n and anterior + comum < n and sequencia_dna[sufixo + comum] == sequencia_dna[anterior + comum]:
+            comum += 1
+        lcp[posicao] = comum
+        if comum:
+            comum -= 1
+
+    return lcp
+
+
+class IndiceSufixos:
+    """
+    Índice reutilizável da sequência de DNA: vetor de sufixos e vetor LCP. A contagem de
+    ocorrências de um gene é uma busca binária em O(|gene| log n), independente de quantas
+    vezes o gene aparece; com limite, as ocorrências seguintes à primeira são contadas pelo
+    vetor LCP, sem comparar texto.
+    """
+
+    def __init__(self, sequencia_dna: str, sufixos: array = None, lcp: array = None):
+        self.sequencia_dna = sequencia_dna
+        self.sufixos = sufixos if sufixos is not None else construir_vetor_sufixos(sequencia_dna)
+        self.lcp = lcp if lcp is not None else construir_lcp(sequencia_dna, self.sufixos)
+
+    def intervalo(self, gene: str) -> Tuple[int, int]:
+        """Intervalo [inicio, fim) do vetor de sufixos cujos sufixos começam com o gene"""
+        sequencia_dna, tamanho = self.sequencia_dna, len(gene)
+        prefixo = lambda sufixo: sequencia_dna[sufixo:sufixo + tamanho]
+        inicio = bisect_left(self.sufixos, gene, key=prefixo)
+        fim = bisect_right(self.sufixos, gene, lo=inicio, key=prefixo)
+        return inicio, fim
+
+    def contar(self, gene: str, limite: int = 0) -> int:
+        """Número de ocorrências (com sobreposição) do gene, parando ao atingir o limite se houver"""
+        if not gene:
+            return 0
+        if not limite:
+            inicio, fim = self.intervalo(gene)
+            return fim - inicio
+
+        # Os sufixos que começam com o gene são consecutivos a partir do primeiro, e cada um
+        # compartilha ao menos len(gene) caracteres com o anterior
+        sequencia_dna, sufixos, lcp, tamanho = self.sequencia_dna, self.sufixos, self.lcp, len(gene)
+        posicao = bisect_left(sufixos, gene, key=lambda sufixo: sequencia_dna[sufixo:sufixo + tamanho])
+        if posicao == len(sufixos) or not sequencia_dna.startswith(gene, sufixos[posicao]):
+            return 0
+        contagem = 1
+        posicao += 1
+        while contagem < limite and posicao < len(sufixos) and lcp[posicao] >= tamanho:
+            contagem += 1
+            posicao += 1
+        return contagem
+
+
+def chave_sequencia(sequencia_dna: str) -> str:
+    """Hash do conteúdo da sequência, usado como nome dos índices no diretório de cache"""
+    return hashlib.sha256(sequencia_dna.encode()).hexdigest()
+
+
+def abrir_mapeamento(caminho: str):
+    """Mapeia um arquivo em memória somente leitura (arquivos vazios não podem ser mapeados)"""
+    with open(caminho, "rb") as arquivo:
+        if os.fstat(arquivo.fileno()).st_size == 0:
+            return b""
+        return mmap.mmap(arquivo.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def mapear_arquivo(caminho: str) -> memoryview:
+    """View de um arquivo mapeado em memória (o mapeamento vive enquanto a view existir)"""
+    return memoryview(abrir_mapeamento(caminho))
+
+
+class SequenciaMapeada:
+    """
+    Trecho [inicio, fim) de um arquivo mapeado em memória, visto como sequência de DNA sem
+    cópia. Oferece len e find, o suficiente para encontrar_ocorrencias_gene buscar direto
+    no mapeamento.
+    """
+
+    def __init__(self, caminho: str, inicio: int, fim: int, mapa=None):
+        self.caminho = caminho
+        self.inicio = inicio
+        self.fim = fim
+        self.mapa = mapa if mapa is not None else abrir_mapeamento(caminho)
+
+    def __len__(self):
+        return self.fim - self.inicio
+
+    def find(self, gene, inicio: int = 0) -> int:
+        # Posições em bytes; em UTF-8 um gene só casa em fronteiras de caractere, então a
+        # contagem de ocorrências é a mesma da str
+        if isinstance(gene, str):
+            gene = gene.encode()
+        posicao = self.mapa.find(gene, self.inicio + inicio, self.fim)
+        return posicao - self.inicio if posicao != -1 else -1
+
+    def view(self) -> memoryview:
+        """View sem cópia dos bytes da sequência"""
+        return memoryview(self.mapa)[self.inicio:self.fim]
+
+    def eh_ascii(self) -> bool:
+        """Se a sequência só tem caracteres ASCII (um byte por base), sem copiá-la"""
+        return re.search(rb"[^\x00-\x7f]", self.view()) is None
+
+    def decodificar(self) -> str:
+        """Cópia da sequência como str, para os motores que trabalham sobre texto"""
+        return str(self.view(), "utf-8")
+
+
+def gravar_arquivo_atomico(caminho: str, partes: Iterable[bytes]):
+    """Grava em um arquivo temporário e renomeia, para que leitores nunca vejam um índice parcial"""
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    with open(temporario, "wb") as arquivo:
+        for parte in partes:
+            arquivo.write(parte)
+    os.replace(temporario, caminho)
+
+
+def carregar_indice_sufixos(sequencia_dna: str, diretorio_cache: str) -> IndiceSufixos:
+    """
+    Obtém o índice de sufixos do diretório de cache, chaveado pelo hash da sequência.
+    O arquivo é mapeado em memória em vez de reconstruído; na primeira execução o índice
+    é construído e salvo para as próximas.
+    """
+    n = len(sequencia_dna)
+    caminho = os.path.join(diretorio_cache, f"{chave_sequencia(sequencia_dna)}.sa")
+
+    if os.path.exists(caminho):
+        dados = mapear_arquivo(caminho)
+        tamanho_vetor = n * array("i").itemsize
+        if len(dados) == 2 * tamanho_vetor:
+            return IndiceSufixos(sequencia_dna, dados[:tamanho_vetor].cast("i"), dados[tamanho_vetor:].cast("i"))
+
+    indice = IndiceSufixos(sequencia_dna)
+    os.makedirs(diretorio_cache, exist_ok=True)
+    gravar_arquivo_atomico(caminho, (indice.sufixos.tobytes(), indice.lcp.tobytes()))
+    return indice
+
+
+def construir_indice_sufixos(sequencia_dna: str, diretorio_cache: str = None, genes: List[str] = None) -> IndiceSufixos:
+    """Índice de sufixos carregado do diretório de cache, se houver, ou construído na hora"""
+    if diretorio_cache:
+        return carregar_indice_sufixos(sequencia_dna, diretorio_cache)
+    return IndiceSufixos(sequencia_dna)
+
+
+class IndiceFM:
+    """
+    Índice FM da sequência: a BWT (1 byte por base) e as contagens de cada símbolo amostradas
+    a cada `amostragem` posições (4 bytes por símbolo por amostra). Com amostragem 64 e o
+    alfabeto ACGT, ocupa cerca de 1,25 byte por base. A contagem de um gene é uma busca para
+    trás em O(|gene|), e o índice pode ser salvo em disco e reaproveitado: carregado, a BWT e
+    as amostras são views do arquivo mapeado em memória.
+    """
+
+    def __init__(self, bwt, amostragem: int, contagens_amostradas: Dict[int, array]):
+        self.bwt = bwt
+        self.amostragem = amostragem
+        self.contagens_amostradas = contagens_amostradas
+        self.simbolos = {simbolo: bytes((simbolo,)) for simbolo in contagens_amostradas}
+
+        # Primeira linha da matriz ordenada que começa com cada símbolo (a linha 0 é o sentinela);
+        # a última amostra de cada símbolo é o seu total na BWT
+        self.primeiras = {}
+        acumulado = 1
+        for simbolo in sorted(contagens_amostradas):
+            self.primeiras[simbolo] = acumulado
+            acumulado += contagens_amostradas[simbolo][-1]
+
+    @classmethod
+    def construir(cls, sequencia_dna: str, amostragem: int = AMOSTRAGEM_FM) -> "IndiceFM":
+        """Constrói a BWT a partir do vetor de sufixos (usado só durante a construção) e as amostras"""
+        texto = sequencia_dna.encode()
+        # Com o sentinela menor que todos os símbolos, a ordem dos sufixos de texto + sentinela
+        # é a do vetor de sufixos de texto precedida do sufixo vazio
+        bwt = bytearray(texto[-1:] or b"\0")
+        bwt.extend(texto[sufixo - 1] if sufixo else 0 for sufixo in construir_vetor_sufixos(texto))
+        bwt = bytes(bwt)
+
+        contagens_amostradas = {}
+        for simbolo in set(texto):
+            caractere = bytes((simbolo,))
+            amostras = array("i", [0])
+            for bloco in range(0, len(bwt), amostragem):
+                amostras.append(amostras[-1] + bwt.count(caractere, bloco, bloco + amostragem))
+            contagens_amostradas[simbolo] = amostras
+        return cls(bwt, amostragem, contagens_amostradas)
+
+    def _ocorrencias_antes(self, simbolo: int, posicao: int) -> int:
+        """Quantas vezes o símbolo aparece em bwt[:posicao]"""
+        bloco = posicao // self.amostragem
+        return self.contagens_amostradas[simbolo][bloco] + \
+            bytes(self.bwt[bloco * self.amostragem:posicao]).count(self.simbolos[simbolo])
+
+    def contar(self, gene: str, limite: int = 0) -> int:
+        """Número de ocorrências (com sobreposição) do gene, por busca para trás (o limite é ignorado)"""
+        if not gene:
+            return 0
+        inicio, fim = 0, len(self.bwt)
+        for simbolo in reversed(gene.encode()):
+            primeira = self.primeiras.get(simbolo)
+            if primeira is None:
+                return 0
+            inicio = primeira + self._ocorrencias_antes(simbolo, inicio)
+            fim = primeira + self._ocorrencias_antes(simbolo, fim)
+            if inicio >= fim:
+                return 0
+        return fim - inicio
+
+    def salvar(self, caminho: str):
+        """Grava o índice: cabeçalho, BWT e as contagens amostradas de cada símbolo"""
+        partes = [_CABECALHO_FM.pack(_ASSINATURA_FM, self.amostragem, len(self.bwt)), self.bwt]
+        for simbolo in sorted(self.contagens_amostradas):
+            partes.append(bytes((simbolo,)))
+            partes.append(self.contagens_amostradas[simbolo].tobytes())
+        gravar_arquivo_atomico(caminho, partes)
+
+    @classmethod
+    def carregar(cls, caminho: str) -> "IndiceFM":
+        """
+        Mapeia um índice gravado por salvar, sem copiar a BWT nem as amostras; devolve None se o
+        arquivo não for um índice válido (inclusive truncado), para que seja reconstruído
+        """
+        dados = mapear_arquivo(caminho)
+        if len(dados) < _CABECALHO_FM.size:
+            return None
+        assinatura, amostragem, tamanho_bwt = _CABECALHO_FM.unpack_from(dados)
+        posicao = _CABECALHO_FM.size + tamanho_bwt
+        if assinatura != _ASSINATURA_FM or amostragem < 1 or tamanho_bwt < 1 or posicao > len(dados):
+            return None
+
+        bwt = dados[_CABECALHO_FM.size:posicao]
+        tamanho_amostras = (-(-tamanho_bwt // amostragem) + 1) * array("i").itemsize
+        if (len(dados) - posicao) % (1 + tamanho_amostras):
+            return None
+        contagens_amostradas = {}
+        while posicao < len(dados):
+            contagens_amostradas[dados[posicao]] = dados[posicao + 1:posicao + 1 + tamanho_amostras].cast("i")
+            posicao += 1 + tamanho_amostras
+        return cls(bwt, amostragem, contagens_amostradas)
+
+
+def construir_indice_fm(sequencia_dna: str, diretorio_cache: str = None, genes: List[str] = None,
+                        amostragem: int = AMOSTRAGEM_FM) -> IndiceFM:
+    """Índice FM carregado do diretório de cache (chaveado pelo hash da sequência) ou construído e salvo"""
+    if not diretorio_cache:
+        return IndiceFM.construir(sequencia_dna, amostragem)
+
+    caminho = os.path.join(diretorio_cache, f"{chave_sequencia(sequencia_dna)}.{amostragem}.fm")
+    if os.path.exists(caminho):
+        indice = IndiceFM.carregar(caminho)
+        if indice is not None and len(indice.bwt) == len(sequencia_dna) + 1:
+            return indice
+
+    indice = IndiceFM.construir(sequencia_dna, amostragem)
+    os.makedirs(diretorio_cache, exist_ok=True)
+    indice.salvar(caminho)
+    return indice
+
+
+def encontrar_ocorrencias_gene(sequencia_dna: str, gene: str, tamanho_minimo_substring: int,
+                               indice=None) -> bool:
     """
     Correspondência de padrões super otimizada - apenas verifica se o gene aparece vezes suficientes
     para contribuir para a probabilidade da doença. Retorna antecipadamente quando o limite é atingido.
+    Com um índice da sequência (qualquer objeto com contar(gene, limite)), a contagem vem do índice.
     """
     if not gene or not sequencia_dna:
         return False
-        
+
     # Só precisa encontrar se o gene aparece vezes suficientes para contar
+    necessarias = ocorrencias_necessarias(gene, tamanho_minimo_substring)
+    if indice is not None:
+        return indice.contar(gene, necessarias) >= necessarias
+    return contar_ocorrencias_diretas(sequencia_dna, gene, necessarias) >= necessarias
+
+
+def contar_ocorrencias_diretas(sequencia_dna: str, gene: str, limite: int = 0) -> int:
+    """Número de ocorrências (com sobreposição) do gene por str.find, parando ao atingir o limite se houver"""
     contagem = 0
     inicio = 0
-    
+
     # Busca de substring simples e rápida que retorna assim que o limite é atingido
     while inicio <= len(sequencia_dna) - len(gene):
         posicao = sequencia_dna.find(gene, inicio)
         if posicao == -1:
             break
-            
-        contagem += len(gene)
-        if contagem >= tamanho_minimo_substring:
-            return True
-            
+
+        contagem += 1
+        if limite and contagem >= limite:
+            break
+
         inicio = posicao + 1
-            
-    return False
+
+    return contagem
+
+
+def ocorrencias_necessarias(gene: str, tamanho_minimo_substring: int) -> int:
+    """
+    Quantidade de ocorrências do gene para que conte para a doença, equivalente ao critério
+    de encontrar_ocorrencias_gene (cada ocorrência soma len(gene), mínimo de uma ocorrência).
+    """
+    return max(1, -(-tamanho_minimo_substring // len(gene)))
+
+
+class AutomatoAhoCorasick:
+    """
+    Autômato de Aho-Corasick sobre todos os genes do painel. Uma única passada pela sequência
+    de DNA conta as ocorrências (com sobreposição) de todos os genes ao mesmo tempo.
+
+    O autômato fica em arrays planos: a tabela de transições é densa (uma linha por nó, uma
+    coluna por símbolo dos genes mais a coluna 0 para os demais caracteres), já com as falhas
+    resolvidas, e os genes terminais de cada nó estão em formato CSR. Assim o mesmo código
+    percorre um autômato recém-construído ou as views de um painel compilado mapeado em memória.
+    """
+
+    def __init__(self, genes: Iterable[str], profundidade_maxima: int = PROFUNDIDADE_MAXIMA_AUTOMATO):
+        genes = list(dict.fromkeys(gene for gene in genes if gene))
+        filhos: List[Dict[str, int]] = [{}]
+        profundidades = [0]
+        terminais: List[List[int]] = [[]]
+
+        for indice, gene in enumerate(genes):
+            no = 0
+            for base in gene[:profundidade_maxima]:
+                proximo = filhos[no].get(base)
+                if proximo is None:
+                    proximo = len(filhos)
+                    filhos[no][base] = proximo
+                    filhos.append({})
+                    profundidades.append(profundidades[no] + 1)
+                    terminais.append([])
+                no = proximo
+            terminais[no].append(indice)
+
+        alfabeto = "".join(sorted({base for arestas in filhos for base in arestas}))
+        codigos = {base: codigo for codigo, base in enumerate(alfabeto, 1)}
+        largura = len(alfabeto) + 1
+        transicoes = array("i", bytes(len(filhos) * largura * array("i").itemsize))
+        falhas, saidas = [0] * len(filhos), array("i", bytes(len(filhos) * array("i").itemsize))
+
+        # Em largura (BFS): a linha de cada nó começa como a linha da sua falha, já completa, e a
+        # falha de cada filho é a transição da falha do pai pelo mesmo símbolo
+        for base, filho in filhos[0].items():
+            transicoes[codigos[base]] = filho
+        fila = list(filhos[0].values())
+        for no in fila:
+            falha = falhas[no]
+            saidas[no] = falha if terminais[falha] else saidas[falha]
+            linha = no * largura
+            transicoes[linha:linha + largura] = transicoes[falha * largura:(falha + 1) * largura]
+            for base, filho in filhos[no].items():
+                codigo = codigos[base]
+                falhas[filho] = transicoes[linha + codigo]
+                transicoes[linha + codigo] = filho
+                fila.append(filho)
+
+        inicios_terminais, lista_terminais = array("i", [0]), array("i")
+        for indices in terminais:
+            lista_terminais.extend(indices)
+            inicios_terminais.append(len(lista_terminais))
+
+        self._definir(genes, alfabeto, transicoes, array("i", profundidades), saidas, inicios_terminais,
+                      lista_terminais)
+
+    def _definir(self, genes: List[str], alfabeto: str, transicoes, profundidades, saidas, inicios_terminais,
+                 terminais):
+        self.genes = genes
+        self.alfabeto = alfabeto
+        self.largura = len(alfabeto) + 1
+        self.transicoes = transicoes
+        self.profundidades = profundidades
+        self.saidas = saidas  # Próximo nó terminal na cadeia de falhas (0 = nenhum)
+        self.inicios_terminais = inicios_terminais
+        self.terminais = terminais
+        self.codigos = {base: codigo for codigo, base in enumerate(alfabeto, 1)}
+        # Tradução de um DNA ASCII para os códigos do alfabeto em uma única operação
+        self.traducao = None
+        if self.largura <= 256:
+            traducao = bytearray(256)
+            for base, codigo in self.codigos.items():
+                if base.isascii():
+                    traducao[ord(base)] = codigo
+            self.traducao = bytes(traducao)
+
+    def codificar(self, sequencia_dna: str):
+        """Códigos do alfabeto de cada base da sequência (0 para caracteres fora dos genes)"""
+        if self.traducao is not None and sequencia_dna.isascii():
+            return sequencia_dna.encode("ascii").translate(self.traducao)
+        return [self.codigos.get(base, 0) for base in sequencia_dna]
+
+    def contar_ocorrencias(self, sequencia_dna: str) -> List[int]:
+        """Conta as ocorrências de cada gene (na ordem de self.genes) com uma única passada"""
+        transicoes, largura, saidas = self.transicoes, self.largura, self.saidas
+        profundidades, inicios_terminais, terminais = self.profundidades, self.inicios_terminais, self.terminais
+        genes = self.genes
+        contagens = [0] * len(genes)
+
+        estado = 0
+        for posicao, codigo in enumerate(self.codificar(sequencia_dna)):
+            estado = transicoes[estado * largura + codigo]
+
+            no = estado if inicios_terminais[estado] != inicios_terminais[estado + 1] else saidas[estado]
+            while no:
+                inicio = posicao - profundidades[no] + 1
+                for terminal in range(inicios_terminais[no], inicios_terminais[no + 1]):
+                    # Prefixos truncados precisam ser confirmados contra o gene completo
+                    indice = terminais[terminal]
+                    gene = genes[indice]
+                    if len(gene) == profundidades[no] or sequencia_dna.startswith(gene, inicio):
+                        contagens[indice] += 1
+                no = saidas[no]
+
+        return contagens
+
+    def tabelas(self) -> Tuple[array, array, array, array, array, array]:
+        """O alfabeto (pontos de código) e os arrays do autômato, na ordem aceita por de_tabelas"""
+        return (array("i", map(ord, self.alfabeto)), self.transicoes, self.profundidades, self.saidas,
+                self.inicios_terminais, self.terminais)
+
+    @classmethod
+    def de_tabelas(cls, genes: List[str], alfabeto, transicoes, profundidades, saidas, inicios_terminais,
+                   terminais) -> "AutomatoAhoCorasick":
+        """Autômato sobre arrays já prontos (por exemplo, views de um arquivo mapeado), sem cópia"""
+        automato = cls.__new__(cls)
+        automato._definir(genes, "".join(map(chr, alfabeto)), transicoes, profundidades, saidas, inicios_terminais,
+                          terminais)
+        return automato
+
+
+def avaliar_genes_aho_corasick(sequencia_dna: str, genes: Iterable[str], tamanho_minimo_substring: int,
+                               diretorio_cache: str = None, indice=None) -> Set[str]:
+    """Retorna o conjunto de genes presentes, avaliando todo o painel em uma única passada pelo DNA"""
+    automato = AutomatoAhoCorasick(genes)
+    contagens = automato.contar_ocorrencias(sequencia_dna)
+    return {
+        gene for gene, contagem in zip(automato.genes, contagens)
+        if contagem >= ocorrencias_necessarias(gene, tamanho_minimo_substring)
+    }
+
+
+def avaliar_genes_busca(sequencia_dna: str, genes: Iterable[str], tamanho_minimo_substring: int,
+                        diretorio_cache: str = None, indice=None) -> Set[str]:
+    """Retorna o conjunto de genes presentes com a busca direta por str.find, gene a gene"""
+    return {
+        gene for gene in dict.fromkeys(genes)
+        if encontrar_ocorrencias_gene(sequencia_dna, gene, tamanho_minimo_substring)
+    }
+
+
+def empacotar_bases(bases) -> bytearray:
+    """
+    Empacota uma sequência em 2 bits por base (4 bases por byte, completando com A no final).
+    Aceita str ou bytes, inclusive uma view do arquivo mapeado, lida em blocos.
+    """
+    if isinstance(bases, str):
+        bases = bases.encode("latin-1", "replace")
+    bases = memoryview(bases)
+    empacotado = bytearray()
+    for inicio in range(0, len(bases), BLOCO_EMPACOTAMENTO):
+        codigos = bytes(bases[inicio:inicio + BLOCO_EMPACOTAMENTO]).translate(_TABELA_CODIGOS)
+        codigos += bytes(-len(codigos) % 4)
+        empacotado += bytes(map(_TABELA_PALAVRAS.__getitem__, memoryview(codigos).cast("I")))
+    return empacotado
+
+
+class SequenciaEmpacotada:
+    """
+    Sequência de DNA com 2 bits por base, um quarto da memória de uma str. A busca de um gene
+    compara bytes empacotados (4 bases por comparação) com bytes.find, uma vez para cada uma
+    das 4 fases de alinhamento; as bases das pontas do gene e as posições com caracteres fora
+    de ACGT são conferidas individualmente. Construída a partir de uma SequenciaMapeada, empacota
+    direto do arquivo mapeado, sem nunca decodificar a sequência como str.
+
+    Genes com menos de TAMANHO_MINIMO_EMPACOTADO bases não preenchem um byte inteiro em alguma
+    fase; esses são buscados por str.find na sequência de origem (a str de quem chama ou o
+    mapeamento do arquivo), como o índice de k-mers faz com os genes menores que k.
+    """
+
+    def __init__(self, sequencia_dna):
+        if isinstance(sequencia_dna, SequenciaMapeada) and not sequencia_dna.eh_ascii():
+            sequencia_dna = sequencia_dna.decodificar()  # Posições em bytes não seriam posições de bases
+        self.tamanho = len(sequencia_dna)
+        self.origem = sequencia_dna
+        if isinstance(sequencia_dna, SequenciaMapeada):
+            bases = sequencia_dna.view()
+            excecoes = [(ocorrencia.start(), ocorrencia.group().decode("latin-1"))
+                        for ocorrencia in re.finditer(rb"[^ACGT]", bases)]
+        else:
+            bases = sequencia_dna
+            excecoes = [(ocorrencia.start(), ocorrencia.group()) for ocorrencia in re.finditer("[^ACGT]", bases)]
+        self.dados = empacotar_bases(bases)
+        self.posicoes_excecoes = array("q", (posicao for posicao, _ in excecoes))
+        self.caracteres_excecoes = "".join(caractere for _, caractere in excecoes)
+
+    def base(self, posicao: int) -> int:
+        """Código de 2 bits da base na posição"""
+        return (self.dados[posicao >> 2] >> ((posicao & 3) << 1)) & 3
+
+    def _confere_excecoes(self, posicao: int, gene: str, irregulares: List[int]) -> bool:
+        """Confere os caracteres fora de ACGT, que o empacotamento não distingue de A"""
+        inicio = bisect_left(self.posicoes_excecoes, posicao)
+        fim = bisect_left(self.posicoes_excecoes, posicao + len(gene), lo=inicio)
+        deslocamentos = set()
+        for indice in range(inicio, fim):
+            deslocamento = self.posicoes_excecoes[indice] - posicao
+            if gene[deslocamento] != self.caracteres_excecoes[indice]:
+                return False
+            deslocamentos.add(deslocamento)
+        return deslocamentos.issuperset(irregulares)
+
+    def contar(self, gene: str, limite: int = 0) -> int:
+        """Número de ocorrências (com sobreposição) do gene, parando ao atingir o limite se houver"""
+        tamanho_gene, tamanho = len(gene), self.tamanho
+        if not tamanho_gene or tamanho_gene > tamanho:
+            return 0
+        if tamanho_gene < TAMANHO_MINIMO_EMPACOTADO:
+            return contar_ocorrencias_diretas(self.origem, gene, limite)
+
+        codigos = [CODIGOS_BASES.get(caractere, 0) for caractere in gene]
+        irregulares = [indice for indice, caractere in enumerate(gene) if caractere not in CODIGOS_BASES]
+        contagem = 0
+
+        for fase in range(4):
+            # Em posições p com p % 4 == fase, as bases [cabeca, cabeca + 4 * completos) do gene
+            # caem em bytes inteiros da sequência empacotada
+            cabeca = min((4 - fase) % 4, tamanho_gene)
+            completos = (tamanho_gene - cabeca) // 4
+            pontas = [*range(cabeca), *range(cabeca + 4 * completos, tamanho_gene)]
+
+            if completos:
+                nucleo = empacotar_bases(gene[cabeca:cabeca + 4 * completos])
+                posicoes = (4 * byte - cabeca for byte in self._alinhamentos(nucleo))
+            else:
+                posicoes = range(fase, tamanho - tamanho_gene + 1, 4)
+
+            for posicao in posicoes:
+                if posicao < 0:
+                    continue
+                if posicao + tamanho_gene > tamanho:
+                    break
+                if any(self.base(posicao + indice) != codigos[indice] for indice in pontas):
+                    continue
+                if (irregulares or self.posicoes_excecoes) and not self._confere_excecoes(posicao, gene, irregulares):
+                    continue
+
+                contagem += 1
+                if limite and contagem >= limite:
+                    return contagem
+
+        return contagem
+
+    def _alinhamentos(self, nucleo: bytes):
+        """Deslocamentos (em bytes) em que o núcleo empacotado aparece na sequência"""
+        byte = self.dados.find(nucleo)
+        while byte != -1:
+            yield byte
+            byte = self.dados.find(nucleo, byte + 1)
+
+
+def escolher_k(tamanho_sequencia: int, genes: Iterable[str]) -> int:
+    """
+    Escolhe o tamanho dos k-mers: o bastante para que uma semente tenha poucas posições
+    candidatas (4^k acima do tamanho da sequência), mas não maior que o 10º percentil do
+    tamanho dos genes, para que quase todos os genes possam usar o índice.
+    """
+    k_seletivo = max(1, math.ceil(math.log(max(tamanho_sequencia, 1), 4)) + 1)
+    tamanhos = sorted(len(gene) for gene in genes if gene)
+    if not tamanhos:
+        return k_seletivo
+    return max(1, min(k_seletivo, tamanhos[len(tamanhos) // 10], K_MAXIMO_KMERS))
+
+
+class IndiceKmers:
+    """
+    Índice de k-mers da sequência em formato CSR: cada k-mer vira um código inteiro (base
+    igual ao número de símbolos da sequência), os códigos distintos ficam ordenados em um
+    array e as posições de todos os k-mers em um único array, agrupadas por código. Um gene
+    é semeado pelo seu primeiro k-mer e só as posições candidatas são conferidas; genes
+    menores que k caem na busca direta por str.find.
+    """
+
+    def __init__(self, sequencia_dna: str, k: int):
+        self.sequencia_dna = sequencia_dna
+        self.k = k
+        self.simbolos = {base: codigo for codigo, base in enumerate(sorted(set(sequencia_dna)))}
+        base = max(len(self.simbolos), 1)
+        modulo = base ** (k - 1)
+
+        # Código de cada k-mer por janela deslizante
+        codigos = array("q") if base ** k < 2 ** 63 else []
+        codigo = 0
+        for posicao, simbolo in enumerate(map(self.simbolos.__getitem__, sequencia_dna)):
+            if posicao >= k:
+                codigo %= modulo
+            codigo = codigo * base + simbolo
+            if posicao >= k - 1:
+                codigos.append(codigo)
+
+        # Ordenação estável: dentro de cada k-mer as posições continuam crescentes
+        ordem = sorted(range(len(codigos)), key=codigos.__getitem__)
+        self.posicoes = array("i", ordem)
+        self.kmers = array("q") if isinstance(codigos, array) else []
+        self.inicios = array("i")
+        anterior = None
+        for indice, posicao in enumerate(ordem):
+            if codigos[posicao] != anterior:
+                anterior = codigos[posicao]
+                self.kmers.append(anterior)
+                self.inicios.append(indice)
+        self.inicios.append(len(ordem))
+
+    def codificar(self, kmer: str):
+        """Código inteiro do k-mer, ou None se ele tem símbolos que não aparecem na sequência"""
+        base = len(self.simbolos)
+        codigo = 0
+        for simbolo in kmer:
+            valor = self.simbolos.get(simbolo)
+            if valor is None:
+                return None
+            codigo = codigo * base + valor
+        return codigo
+
+    def contar(self, gene: str, limite: int = 0) -> int:
+        """Número de ocorrências (com sobreposição) do gene, parando ao atingir o limite se houver"""
+        sequencia_dna = self.sequencia_dna
+        if len(gene) < self.k:
+            return contar_ocorrencias_diretas(sequencia_dna, gene, limite)
+
+        codigo = self.codificar(gene[:self.k])
+        indice = bisect_left(self.kmers, codigo) if codigo is not None else len(self.kmers)
+        if indice == len(self.kmers) or self.kmers[indice] != codigo:
+            return 0
+
+        posicoes = self.posicoes
+        contagem = 0
+        for candidata in range(self.inicios[indice], self.inicios[indice + 1]):
+            if sequencia_dna.startswith(gene, posicoes[candidata]):
+                contagem += 1
+                if limite and contagem >= limite:
+                    break
+        return contagem
+
+
+def construir_indice_kmers(sequencia_dna: str, diretorio_cache: str = None, genes: List[str] = None) -> IndiceKmers:
+    """Índice de k-mers com k escolhido pela distribuição de tamanhos dos genes"""
+    return IndiceKmers(sequencia_dna, escolher_k(len(sequencia_dna), genes or ()))
+
+
+class AutomatoSufixos:
+    """
+    Autômato de sufixos da sequência de DNA, construído uma única vez em O(n). Conta as
+    ocorrências exatas de um gene em O(|gene|) e calcula as estatísticas de correspondência
+    do gene, de onde sai a fração do gene coberta por trechos de pelo menos K bases presentes
+    na sequência.
+    """
+
+    def __init__(self, sequencia_dna: str):
+        self.transicoes: List[Dict[str, int]] = [{}]
+        self.links = [-1]
+        self.comprimentos = [0]
+        self.ocorrencias = [0]
+
+        ultimo = 0
+        for base in sequencia_dna:
+            ultimo = self._estender(ultimo, base)
+
+        # Ocorrências de cada estado = tamanho do conjunto de posições finais, acumulado dos
+        # estados mais longos para os seus links
+        for estado in sorted(range(1, len(self.comprimentos)), key=self.comprimentos.__getitem__, reverse=True):
+            self.ocorrencias[self.links[estado]] += self.ocorrencias[estado]
+
+    def _novo_estado(self, comprimento: int, transicoes: Dict[str, int], link: int, ocorrencias: int) -> int:
+        self.transicoes.append(transicoes)
+        self.links.append(link)
+        self.comprimentos.append(comprimento)
+        self.ocorrencias.append(ocorrencias)
+        return len(self.comprimentos) - 1
+
+    def _estender(self, ultimo: int, base: str) -> int:
+        transicoes, links, comprimentos = self.transicoes, self.links, self.comprimentos
+        atual = self._novo_estado(comprimentos[ultimo] + 1, {}, -1, 1)
+
+        estado = ultimo
+        while estado != -1 and base not in transicoes[estado]:
+            transicoes[estado][base] = atual
+            estado = links[estado]
+
+        if estado == -1:
+            links[atual] = 0
+            return atual
+
+        proximo = transicoes[estado][base]
+        if comprimentos[estado] + 1 == comprimentos[proximo]:
+            links[atual] = proximo
+            return atual
+
+        clone = self._novo_estado(comprimentos[estado] + 1, dict(transicoes[proximo]), links[proximo], 0)
+        while estado != -1 and transicoes[estado].get(base) == proximo:
+            transicoes[estado][base] = clone
+            estado = links[estado]
+        links[proximo] = links[atual] = clone
+        return atual
+
+    def contar(self, gene: str, limite: int = 0) -> int:
+        """Número de ocorrências (com sobreposição) do gene na sequência (exato, o limite é ignorado)"""
+        estado = 0
+        for base in gene:
+            estado = self.transicoes[estado].get(base)
+            if estado is None:
+                return 0
+        return self.ocorrencias[estado] if gene else 0
+
+    def estatisticas_correspondencia(self, gene: str) -> List[int]:
+        """Para cada posição i do gene, o tamanho do maior sufixo de gene[:i + 1] presente na sequência"""
+        transicoes, links, comprimentos = self.transicoes, self.links, self.comprimentos
+        estatisticas = []
+        estado = comprimento = 0
+        for base in gene:
+            while estado and base not in transicoes[estado]:
+                estado = links[estado]
+                comprimento = comprimentos[estado]
+            if base in transicoes[estado]:
+                estado = transicoes[estado][base]
+                comprimento += 1
+            else:
+                comprimento = 0
+            estatisticas.append(comprimento)
+        return estatisticas
+
+    def cobertura(self, gene: str, tamanho_minimo_substring: int) -> float:
+        """Fração das bases do gene cobertas por trechos de pelo menos tamanho_minimo_substring bases presentes na sequência"""
+        if not gene:
+            return 0.0
+        tamanho_minimo = max(tamanho_minimo_substring, 1)
+        cobertas = 0
+        coberto_ate = 0  # Primeira posição ainda não coberta
+        for fim, comprimento in enumerate(self.estatisticas_correspondencia(gene), 1):
+            if comprimento >= tamanho_minimo:
+                # Os inícios dos trechos nunca recuam, então basta somar a parte nova do intervalo
+                cobertas += fim - max(fim - comprimento, coberto_ate)
+                coberto_ate = fim
+        return cobertas / len(gene)
+
+
+def escrever_cobertura(arquivo, automato: AutomatoSufixos, genes: Iterable[str], tamanho_minimo_substring: int):
+    """Escreve, para cada gene, a fração coberta por trechos de pelo menos tamanho_minimo_substring bases"""
+    arquivo.writelines(f"{gene} {automato.cobertura(gene, tamanho_minimo_substring):.4f}\n" for gene in genes)
+
+
+def contar_shift_or(sequencia_dna: str, genes: List[str], limites: List[int]) -> List[int]:
+    """
+    Shift-Or com vários genes empacotados lado a lado em um inteiro, um trecho de bits por
+    gene: cada base do DNA avança todos os genes do grupo com algumas operações sobre o
+    inteiro. Um bit 0 no trecho de um gene indica que aquele prefixo do gene casa terminando
+    na posição atual. A passada termina quando todos os genes atingem seus limites.
+    """
+    casam = {}  # Bits dos genes que casam com cada caractere
+    inicios = finais = 0
+    genes_por_bit_final = {}
+    deslocamento = 0
+    for indice, gene in enumerate(genes):
+        for posicao, caractere in enumerate(gene):
+            casam[caractere] = casam.get(caractere, 0) | 1 << (deslocamento + posicao)
+        inicios |= 1 << deslocamento
+        deslocamento += len(gene)
+        finais |= 1 << (deslocamento - 1)
+        genes_por_bit_final[deslocamento - 1] = indice
+
+    todos = (1 << deslocamento) - 1
+    nao_casam = {caractere: todos & ~bits for caractere, bits in casam.items()}
+    # Limpa o primeiro bit de cada gene após o deslocamento: o prefixo vazio sempre casa, e o
+    # bit que vem do gene vizinho não deve interferir
+    manter = todos & ~inicios
+
+    contagens = [0] * len(genes)
+    pendentes = finais
+    estado = todos
+    for caractere in sequencia_dna:
+        estado = ((estado << 1) & manter) | nao_casam.get(caractere, todos)
+        casamentos = ~estado & pendentes
+        if not casamentos:
+            continue
+        while casamentos:
+            bit = casamentos & -casamentos
+            casamentos ^= bit
+            indice = genes_por_bit_final[bit.bit_length() - 1]
+            contagens[indice] += 1
+            if contagens[indice] >= limites[indice]:
+                pendentes &= ~bit
+        if not pendentes:
+            break
+
+    return contagens
+
+
+def contar_myers(sequencia_dna: str, gene: str, edicoes_maximas: int, limite: int = 0) -> int:
+    """
+    Algoritmo bit-paralelo de Myers: conta as posições do DNA em que termina um trecho a no
+    máximo `edicoes_maximas` edições (inserção, remoção ou troca) do gene, parando ao
+    atingir o limite se houver. Com zero edições, equivale à contagem exata.
+    """
+    tamanho_gene = len(gene)
+    if not tamanho_gene:
+        return 0
+    todos = (1 << tamanho_gene) - 1
+    ultimo = 1 << (tamanho_gene - 1)
+    casam = {}
+    for posicao, caractere in enumerate(gene):
+        casam[caractere] = casam.get(caractere, 0) | 1 << posicao
+
+    positivos, negativos, distancia = todos, 0, tamanho_gene
+    contagem = 0
+    for caractere in sequencia_dna:
+        iguais = casam.get(caractere, 0)
+        vertical = iguais | negativos
+        horizontal = ((((iguais & positivos) + positivos) & todos) ^ positivos) | iguais
+        horizontal_positivos = negativos | (todos & ~(horizontal | positivos))
+        horizontal_negativos = positivos & horizontal
+        if horizontal_positivos & ultimo:
+            distancia += 1
+        elif horizontal_negativos & ultimo:
+            distancia -= 1
+        horizontal_positivos = (horizontal_positivos << 1) & todos
+        horizontal_negativos = (horizontal_negativos << 1) & todos
+        positivos = horizontal_negativos | (todos & ~(vertical | horizontal_positivos))
+        negativos = horizontal_positivos & vertical
+
+        if distancia <= edicoes_maximas:
+            contagem += 1
+            if limite and contagem >= limite:
+                break
+
+    return contagem
+
+
+def avaliar_genes_bitparalelo(sequencia_dna: str, genes: Iterable[str], tamanho_minimo_substring: int,
+                              diretorio_cache: str = None, indice=None, edicoes_maximas: int = 0) -> Set[str]:
+    """
+    Retorna o conjunto de genes presentes com casamento bit-paralelo: Shift-Or em grupos para
+    os genes curtos e busca direta para os longos. Com edições permitidas, cada gene é casado
+    pelo algoritmo de Myers e conta cada posição em que um trecho próximo do gene termina.
+    """
+    genes = [gene for gene in dict.fromkeys(genes) if gene]
+    if edicoes_maximas:
+        genes_presentes = set()
+        for gene in genes:
+            necessarias = ocorrencias_necessarias(gene, tamanho_minimo_substring)
+            if contar_myers(sequencia_dna, gene, edicoes_maximas, necessarias) >= necessarias:
+                genes_presentes.add(gene)
+        return genes_presentes
+
+    genes_presentes = {
+        gene for gene in genes
+        if len(gene) > TAMANHO_MAXIMO_BITPARALELO and encontrar_ocorrencias_gene(sequencia_dna, gene, tamanho_minimo_substring)
+    }
+
+    grupo, bits_grupo = [], 0
+    curtos = [gene for gene in genes if len(gene) <= TAMANHO_MAXIMO_BITPARALELO]
+    for posicao, gene in enumerate(curtos):
+        grupo.append(gene)
+        bits_grupo += len(gene)
+        ultimo_do_grupo = posicao + 1 == len(curtos) or \
+            bits_grupo + len(curtos[posicao + 1]) > BITS_POR_GRUPO_BITPARALELO
+        if ultimo_do_grupo:
+            limites = [ocorrencias_necessarias(gene, tamanho_minimo_substring) for gene in grupo]
+            contagens = contar_shift_or(sequencia_dna, grupo, limites)
+            genes_presentes.update(gene for gene, contagem, limite in zip(grupo, contagens, limites) if contagem >= limite)
+            grupo, bits_grupo = [], 0
+
+    return genes_presentes
+
+
+def potencias_uint64(base: int, quantidade: int):
+    """Vetor numpy com base^0 .. base^(quantidade - 1) módulo 2^64"""
+    potencias = np.full(quantidade, base, dtype=np.uint64)
+    if quantidade:
+        potencias[0] = 1
+    return np.cumprod(potencias, dtype=np.uint64)
+
+
+class IndiceNumpy:
+    """
+    Sequência codificada como vetor de pontos de código com somas prefixadas de hash polinomial
+    (módulo 2^64).
+    O hash de todas as janelas de um tamanho L sai de uma única operação vetorizada:
+    hash(i) = B^i × (P[i + L] - P[i]), onde P[i] = soma de c[t] × B^-t para t < i.
+    """
+
+    def __init__(self, sequencia_dna: str):
+        self.sequencia_dna = sequencia_dna
+        codigos = np.frombuffer(sequencia_dna.encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+        tamanho = len(codigos)
+        self.potencias = potencias_uint64(BASE_HASH, tamanho + 1)
+        self.inversas = potencias_uint64(INVERSO_BASE_HASH, tamanho + 1)
+        self.prefixos = np.zeros(tamanho + 1, dtype=np.uint64)
+        np.cumsum(codigos * self.inversas[:tamanho], dtype=np.uint64, out=self.prefixos[1:])
+
+    def hashes_janelas(self, tamanho_janela: int):
+        """Hash de cada janela de tamanho_janela bases da sequência"""
+        quantidade = len(self.prefixos) - tamanho_janela
+        return self.potencias[:quantidade] * (self.prefixos[tamanho_janela:] - self.prefixos[:quantidade])
+
+    def hashes_genes(self, genes: List[str]):
+        """Hash de um lote de genes de mesmo tamanho, calculado como uma matriz"""
+        tamanho_gene = len(genes[0])
+        matriz = np.frombuffer("".join(genes).encode("utf-32-le"), dtype=np.uint32).reshape(len(genes), tamanho_gene)
+        return (matriz.astype(np.uint64) * self.inversas[:tamanho_gene]).sum(axis=1, dtype=np.uint64)
+
+
+def avaliar_genes_numpy(sequencia_dna: str, genes: Iterable[str], tamanho_minimo_substring: int,
+                        diretorio_cache: str = None, indice: IndiceNumpy = None) -> Set[str]:
+    """
+    Retorna o conjunto de genes presentes agrupando os genes por tamanho: para cada tamanho, os
+    hashes de todas as janelas do DNA são comparados de uma vez com os hashes ordenados do lote
+    de genes (busca binária vetorizada). Só as janelas cujo hash coincide com o de algum gene
+    são conferidas contra a sequência, descartando colisões de hash.
+    """
+    if indice is None:
+        indice = IndiceNumpy(sequencia_dna)
+
+    genes_por_tamanho: Dict[int, List[str]] = {}
+    for gene in dict.fromkeys(genes):
+        if gene and len(gene) <= len(sequencia_dna):
+            genes_por_tamanho.setdefault(len(gene), []).append(gene)
+
+    genes_presentes = set()
+    for tamanho_gene, lote in genes_por_tamanho.items():
+        hashes = indice.hashes_genes(lote)
+        genes_por_hash: Dict[int, List[str]] = {}
+        for gene, valor in zip(lote, hashes.tolist()):
+            genes_por_hash.setdefault(valor, []).append(gene)
+        hashes_ordenados = np.unique(hashes)
+
+        janelas = indice.hashes_janelas(tamanho_gene)
+        posicoes_hash = np.minimum(np.searchsorted(hashes_ordenados, janelas), len(hashes_ordenados) - 1)
+        candidatas = np.flatnonzero(hashes_ordenados[posicoes_hash] == janelas)
+
+        contagens: Dict[str, int] = {}
+        for posicao, valor in zip(candidatas.tolist(), janelas[candidatas].tolist()):
+            for gene in genes_por_hash[valor]:
+                if gene not in genes_presentes and sequencia_dna.startswith(gene, posicao):
+                    contagens[gene] = contagens.get(gene, 0) + 1
+                    if contagens[gene] >= ocorrencias_necessarias(gene, tamanho_minimo_substring):
+                        genes_presentes.add(gene)
+
+    return genes_presentes
+
+
+def contar_rabin_karp(sequencia_dna: str, genes: List[str], limites: List[int],
+                      genes_minimos: int = GENES_MINIMOS_RABIN_KARP) -> List[int]:
+    """
+    Rabin-Karp com vários padrões: para cada tamanho distinto de gene, uma única janela
+    deslizante com hash rolante percorre o DNA e cada hash é procurado entre os hashes dos genes
+    daquele tamanho; coincidências são conferidas contra o gene. A contagem de cada gene para
+    no seu limite, e a varredura de um tamanho termina quando todos os seus genes o atingem.
+    Tamanhos com menos de genes_minimos genes não pagam a varredura: cada gene é buscado por
+    str.find, mais rápido que o laço em Python para poucos genes.
+    """
+    texto = sequencia_dna.encode("latin-1", "replace")
+    tamanho = len(texto)
+    base, modulo = BASE_RABIN_KARP, MODULO_RABIN_KARP
+    contagens = [0] * len(genes)
+
+    indices_por_tamanho: Dict[int, List[int]] = {}
+    for indice, gene in enumerate(genes):
+        if gene and len(gene) <= tamanho:
+            indices_por_tamanho.setdefault(len(gene), []).append(indice)
+
+    def hash_inicial(dados) -> int:
+        valor = 0
+        for codigo in dados:
+            valor = (valor * base + codigo) % modulo
+        return valor
+
+    for tamanho_gene, indices in indices_por_tamanho.items():
+        if len(indices) < genes_minimos:
+            for indice in indices:
+                contagens[indice] = contar_ocorrencias_diretas(sequencia_dna, genes[indice], limites[indice])
+            continue
+
+        alvos: Dict[int, List[int]] = {}
+        for indice in indices:
+            alvos.setdefault(hash_inicial(genes[indice].encode("latin-1", "replace")), []).append(indice)
+        pendentes = len(indices)
+        peso_saida = pow(base, tamanho_gene - 1, modulo)
+
+        valor = hash_inicial(texto[:tamanho_gene])
+        for posicao in range(tamanho - tamanho_gene + 1):
+            candidatos = alvos.get(valor)
+            if candidatos:
+                for indice in candidatos:
+                    if contagens[indice] < limites[indice] and sequencia_dna.startswith(genes[indice], posicao):
+                        contagens[indice] += 1
+                        if contagens[indice] == limites[indice]:
+                            pendentes -= 1
+                if not pendentes:
+                    break
+            if posicao + tamanho_gene < tamanho:
+                valor = ((valor - texto[posicao] * peso_saida) * base + texto[posicao + tamanho_gene]) % modulo
+
+    return contagens
 
 
-def calcular_probabilidade_doenca(sequencia_dna: str, genes: List[str], tamanho_minimo_substring: int):
+def avaliar_genes_rabin_karp(sequencia_dna: str, genes: Iterable[str], tamanho_minimo_substring: int,
+                             diretorio_cache: str = None, indice=None) -> Set[str]:
+    """Retorna o conjunto de genes presentes com uma varredura de Rabin-Karp por tamanho distinto de gene"""
+    genes = [gene for gene in dict.fromkeys(genes) if gene]
+    limites = [ocorrencias_necessarias(gene, tamanho_minimo_substring) for gene in genes]
+    contagens = contar_rabin_karp(sequencia_dna, genes, limites)
+    return {gene for gene, contagem, limite in zip(genes, contagens, limites) if contagem >= limite}
+
+
+# Motores de correspondência disponíveis na linha de comando. O diretório de cache e o índice
+# pré-construído só são usados pelos motores que indexam a sequência de DNA.
+def avaliar_genes_com_indice(motor: str, sequencia_dna: str, genes: Iterable[str], tamanho_minimo_substring: int,
+                            diretorio_cache: str = None, indice=None) -> Set[str]:
+    """
+    Retorna o conjunto de genes presentes contando cada gene no índice da sequência do motor
+    (qualquer objeto com contar(gene, limite)), construído por INDICES_MOTORES se não vier pronto
+    """
+    genes = list(dict.fromkeys(genes))
+    if indice is None:
+        indice = preparar_indice(motor, sequencia_dna, diretorio_cache, genes)
+    return {
+        gene for gene in genes
+        if encontrar_ocorrencias_gene(sequencia_dna, gene, tamanho_minimo_substring, indice)
+    }
+
+
+def apenas_sequencia(classe):
+    """Construtor de índice que só depende da sequência (ignora o diretório de cache e os genes)"""
+    return lambda sequencia_dna, diretorio_cache=None, genes=None: classe(sequencia_dna)
+
+
+MOTORES = {
+    "aho-corasick": avaliar_genes_aho_corasick,
+    "sufixos": partial(avaliar_genes_com_indice, "sufixos"),
+    "busca": avaliar_genes_busca,
+    "empacotado": partial(avaliar_genes_com_indice, "empacotado"),
+    "kmers": partial(avaliar_genes_com_indice, "kmers"),
+    "automato": partial(avaliar_genes_com_indice, "automato"),
+    "fm": partial(avaliar_genes_com_indice, "fm"),
+    "bitparalelo": avaliar_genes_bitparalelo,
+    "numpy": avaliar_genes_numpy,
+    "rabin-karp": avaliar_genes_rabin_karp,
+}
+
+# Construtores dos índices da sequência, feitos uma única vez (a partir dos genes do primeiro
+# lote) e reaproveitados por todos os lotes
+INDICES_MOTORES = {
+    "sufixos": construir_indice_sufixos,
+    "empacotado": apenas_sequencia(SequenciaEmpacotada),
+    "kmers": construir_indice_kmers,
+    "automato": apenas_sequencia(AutomatoSufixos),
+    "fm": construir_indice_fm,
+    "numpy": apenas_sequencia(IndiceNumpy),
+}
+
+# Motores que buscam gene a gene diretamente nos processos trabalhadores, sobre a sequência
+# compartilhada; os demais avaliam o painel inteiro de uma vez no processo principal
+MOTORES_DISTRIBUIDOS = {"busca"}
+
+# Motores que trabalham direto sobre a SequenciaMapeada, sem decodificar a sequência como str
+MOTORES_MAPEADOS = {"empacotado"}
+
+
+def preparar_indice(motor: str, sequencia_dna: str, diretorio_cache: str = None, genes: List[str] = None):
+    """Índice da sequência usado pelo motor, ou None para motores que não indexam o DNA"""
+    construtor = INDICES_MOTORES.get(motor)
+    return construtor(sequencia_dna, diretorio_cache, genes) if construtor else None
+
+
+def calcular_probabilidade_doenca(sequencia_dna: str, genes: List[str], tamanho_minimo_substring: int,
+                                  genes_presentes: Set[str] = None):
     """Cálculo de probabilidade de doença ultra-otimizado"""
     if not genes:
         return 0
@@ -53,18 +1330,105 @@ def calcular_probabilidade_doenca(sequencia_dna: str, genes: List[str], tamanho_
     # Usa uma abordagem de bitmap para melhor desempenho em listas grandes
     genes_correspondentes = 0
     
-    for gene in genes:
-        if encontrar_ocorrencias_gene(sequencia_dna, gene, tamanho_minimo_substring):
-            genes_correspondentes += 1
+    if genes_presentes is not None:
+        # Veredictos já calculados para o painel inteiro
+        genes_correspondentes = sum(1 for gene in genes if gene in genes_presentes)
+    else:
+        for gene in genes:
+            if encontrar_ocorrencias_gene(sequencia_dna, gene, tamanho_minimo_substring):
+                genes_correspondentes += 1
             
-    probabilidade_doenca = math.floor(((genes_correspondentes / len(genes)) * 100)+0.5)
+    return probabilidade_por_contagem(genes_correspondentes, len(genes))
+
+
+def probabilidade_por_contagem(genes_correspondentes: int, total_genes: int) -> int:
+    """Porcentagem arredondada de genes correspondentes, limitada a 100"""
+    if not total_genes:
+        return 0
+    probabilidade_doenca = math.floor(((genes_correspondentes / total_genes) * 100)+0.5)
     return min(probabilidade_doenca, 100)
 
 
+def compilar_painel(tamanho_minimo_substring: int, linhas_doencas: Iterable[str],
+                    com_automato: bool = True) -> PainelCompilado:
+    """Compila as linhas de doenças em um PainelCompilado, com o autômato de Aho-Corasick dos genes"""
+    codigos, inicios, indices_genes = [], array("i", [0]), array("i")
+    indices_por_gene: Dict[str, int] = {}
+    for linha_doenca in linhas_doencas:
+        partes = linha_doenca.split()
+        codigos.append(partes[0])
+        for gene in partes[2:]:
+            indices_genes.append(indices_por_gene.setdefault(gene, len(indices_por_gene)))
+        inicios.append(len(indices_genes))
+
+    genes = list(indices_por_gene)
+    automato = AutomatoAhoCorasick(genes) if com_automato else None
+    return PainelCompilado(tamanho_minimo_substring, codigos, genes, inicios, indices_genes, automato)
+
+
+def avaliar_painel(painel: PainelCompilado, sequencia_dna: str, avaliar_genes=None,
+                   diretorio_cache: str = None, tamanho_minimo_substring: int = None) -> List[bool]:
+    """
+    Veredicto de cada gene único do painel para uma sequência: pelo autômato pré-compilado do
+    painel ou, quando informado, por outro motor. O tamanho mínimo só é aplicado aqui, então o
+    de quem chama (por exemplo, o da primeira linha do arquivo de DNA) prevalece sobre o do painel.
+    """
+    if tamanho_minimo_substring is None:
+        tamanho_minimo_substring = painel.tamanho_minimo_substring
+    if avaliar_genes is None and painel.automato is not None:
+        contagens = painel.automato.contar_ocorrencias(sequencia_dna)
+        return [
+            contagem >= ocorrencias_necessarias(gene, tamanho_minimo_substring)
+            for gene, contagem in zip(painel.genes, contagens)
+        ]
+    genes_presentes = (avaliar_genes or avaliar_genes_aho_corasick)(
+        sequencia_dna, painel.genes, tamanho_minimo_substring, diretorio_cache)
+    return [gene in genes_presentes for gene in painel.genes]
+
+
+def pontuar_painel(painel: PainelCompilado, presentes: List[bool]) -> List[Doenca]:
+    """Probabilidade de cada doença do painel a partir dos veredictos dos genes"""
+    doencas = []
+    genes, inicios, indices_genes = painel.genes, painel.inicios, painel.indices_genes
+    for posicao, codigo in enumerate(painel.codigos):
+        indices = indices_genes[inicios[posicao]:inicios[posicao + 1]]
+        correspondentes = sum(1 for indice in indices if presentes[indice])
+        doencas.append(Doenca(codigo, [genes[indice] for indice in indices],
+                              probabilidade_por_contagem(correspondentes, len(indices))))
+    return doencas
+
+
+def inicializar_trabalhador(origem_sequencia, tamanho_minimo_substring: int):
+    """
+    Inicializador do pool: mapeia o trecho do arquivo de entrada que contém a sequência
+    (caminho, início, fim), compartilhado entre os processos sem cópia. Threads recebem a
+    própria SequenciaMapeada do processo principal.
+    """
+    global _sequencia_compartilhada, _tamanho_minimo_compartilhado
+    if isinstance(origem_sequencia, SequenciaMapeada):
+        # Threads e execução serial compartilham o mapeamento do processo principal
+        _sequencia_compartilhada = origem_sequencia
+    elif origem_sequencia is not None:
+        _sequencia_compartilhada = SequenciaMapeada(*origem_sequencia)
+    _tamanho_minimo_compartilhado = tamanho_minimo_substring
+
+
+def avaliar_grupo_genes(genes: List[str]) -> Set[str]:
+    """Busca um grupo de genes únicos na sequência compartilhada do trabalhador"""
+    return {
+        gene for gene in genes
+        if encontrar_ocorrencias_gene(_sequencia_compartilhada, gene, _tamanho_minimo_compartilhado)
+    }
+
+
 def processar_grupo_doencas(argumentos):
-    """Processa um grupo inteiro de doenças independentemente"""
-    linhas_doencas, sequencia_dna, tamanho_minimo_substring = argumentos
-    
+    """
+    Processa um grupo inteiro de doenças a partir dos veredictos de genes já calculados.
+    O resultado já vem distribuído em baldes por probabilidade (ver agrupar_por_probabilidade),
+    truncado às `limite` doenças mais prováveis do grupo quando houver limite.
+    """
+    linhas_doencas, genes_presentes, limite = argumentos
+
     resultados = []
     for linha_doenca in linhas_doencas:
         partes = linha_doenca.strip().split()
@@ -72,22 +1436,139 @@ def processar_grupo_doencas(argumentos):
         genes = partes[2:]  # Genes começam no terceiro elemento
         
         # Calcula a probabilidade da doença
-        probabilidade_doenca = calcular_probabilidade_doenca(sequencia_dna, genes, tamanho_minimo_substring)
+        probabilidade_doenca = calcular_probabilidade_doenca(None, genes, 0, genes_presentes)
         
         resultados.append(Doenca(codigo, genes, probabilidade_doenca))
         
-    return resultados
+    baldes = agrupar_por_probabilidade(resultados)
+    if limite is not None:
+        baldes = truncar_baldes(baldes, limite)
+    return baldes
+
+
+def limites_linha(mapa, inicio: int) -> Tuple[int, int, int]:
+    """Conteúdo [inicio, fim) da linha que começa em inicio, sem espaços nas pontas, e o início da próxima"""
+    quebra = mapa.find(b"\n", inicio)
+    proxima = len(mapa) if quebra == -1 else quebra + 1
+    fim = proxima if quebra == -1 else quebra
+    while inicio < fim and mapa[inicio:inicio + 1].isspace():
+        inicio += 1
+    while fim > inicio and mapa[fim - 1:fim].isspace():
+        fim -= 1
+    return inicio, fim, proxima
+
+
+def ler_arquivo_em_fluxo(nome_arquivo_entrada: str):
+    """
+    Lê o arquivo de entrada mapeado em memória. A sequência de DNA é devolvida como
+    SequenciaMapeada (sem cópia) e as linhas de doenças como um gerador, lido sob demanda.
+    """
+    mapa = abrir_mapeamento(nome_arquivo_entrada)
+    inicio, fim, proxima = limites_linha(mapa, 0)
+    tamanho_minimo_substring = int(mapa[inicio:fim])
+    inicio, fim, proxima = limites_linha(mapa, proxima)
+    sequencia_dna = SequenciaMapeada(nome_arquivo_entrada, inicio, fim, mapa)
+    inicio, fim, proxima = limites_linha(mapa, proxima)
+    quantidade_doencas = int(mapa[inicio:fim])
+
+    def linhas_doencas(posicao):
+        for _ in range(quantidade_doencas):
+            inicio, fim, posicao = limites_linha(mapa, posicao)
+            yield mapa[inicio:fim].decode()
+
+    return tamanho_minimo_substring, sequencia_dna, linhas_doencas(proxima)
 
 
 def ler_arquivo(nome_arquivo_entrada: str):
     """Lê o arquivo de entrada com mínimo uso de memória"""
-    with open(nome_arquivo_entrada, "r") as arquivo:
-        tamanho_minimo_substring = int(arquivo.readline().strip())
-        sequencia_dna = arquivo.readline().strip()
-        quantidade_doencas = int(arquivo.readline().strip())
-        linhas_doencas = [arquivo.readline().strip() for _ in range(quantidade_doencas)]
-    
-    return tamanho_minimo_substring, sequencia_dna, linhas_doencas
+    tamanho_minimo_substring, sequencia_dna, linhas_doencas = ler_arquivo_em_fluxo(nome_arquivo_entrada)
+    return tamanho_minimo_substring, sequencia_dna.decodificar(), list(linhas_doencas)
+
+
+def agrupar_em_lotes(iteravel: Iterable, tamanho_lote: int) -> Iterator[list]:
+    """Agrupa um iterável em listas de até tamanho_lote itens, consumindo-o sob demanda"""
+    iterador = iter(iteravel)
+    while True:
+        lote = list(islice(iterador, tamanho_lote))
+        if not lote:
+            return
+        yield lote
+
+
+def deduplicar_genes(linhas_doencas: List[str]) -> Tuple[List[str], int]:
+    """
+    Coleta os genes únicos de todas as doenças, na ordem da primeira aparição, para que cada
+    gene seja avaliado uma única vez. Retorna também quantas repetições foram descartadas.
+    """
+    genes_unicos = {}
+    total_genes = 0
+    for linha_doenca in linhas_doencas:
+        genes = linha_doenca.split()[2:]
+        total_genes += len(genes)
+        genes_unicos.update(dict.fromkeys(genes))
+    return list(genes_unicos), total_genes - len(genes_unicos)
+
+
+def agrupar_por_probabilidade(doencas: Iterable[Doenca]) -> List[List[Doenca]]:
+    """
+    Distribui as doenças em baldes por probabilidade, do balde de 100% (índice 0) ao de 0%.
+    Cada balde mantém a ordem original das doenças.
+    """
+    baldes = [[] for _ in range(PROBABILIDADE_MAXIMA + 1)]
+    for doenca in doencas:
+        baldes[PROBABILIDADE_MAXIMA - doenca.probabilidade_doenca].append(doenca)
+    return baldes
+
+
+def intercalar_baldes(grupos_baldes: List[List[List[Doenca]]]) -> List[Doenca]:
+    """
+    Combina os baldes de vários grupos (na ordem dos grupos) em uma única lista ordenada.
+    Custo linear: O(n + 101 × grupos).
+    """
+    return [
+        doenca
+        for indice_balde in range(PROBABILIDADE_MAXIMA + 1)
+        for baldes in grupos_baldes
+        for doenca in baldes[indice_balde]
+    ]
+
+
+def truncar_baldes(baldes: List[List[Doenca]], limite: int) -> List[List[Doenca]]:
+    """Mantém apenas as `limite` primeiras doenças na ordem final dos baldes"""
+    truncados = []
+    for balde in baldes:
+        truncados.append(balde[:limite])
+        limite -= len(truncados[-1])
+    return truncados
+
+
+class SelecaoTopK:
+    """
+    Seleção das K doenças mais prováveis à medida que os grupos chegam dos trabalhadores,
+    guardando no máximo K registros em um heap. Os grupos devem chegar na ordem original e
+    já ordenados; empates são desfeitos pela ordem de chegada, reproduzindo exatamente as K
+    primeiras linhas da saída completa.
+    """
+
+    def __init__(self, k: int):
+        self.k = k
+        self.heap = []  # Mínimo no topo: (probabilidade, -ordem de chegada, doença)
+        self.chegadas = 0
+
+    def adicionar(self, doencas: Iterable[Doenca]):
+        for doenca in doencas:
+            self.chegadas += 1
+            item = (doenca.probabilidade_doenca, -self.chegadas, doenca)
+            if len(self.heap) < self.k:
+                heappush(self.heap, item)
+            elif item[:2] > self.heap[0][:2]:
+                heapreplace(self.heap, item)
+            else:
+                # Grupo já ordenado: as próximas doenças também não entram
+                break
+
+    def resultado(self) -> List[Doenca]:
+        return [item[2] for item in sorted(self.heap, key=lambda item: (-item[0], -item[1]))]
 
 
 def ordenar_doencas(doencas: List[Doenca]):
@@ -95,28 +1576,614 @@ def ordenar_doencas(doencas: List[Doenca]):
     Ordena doenças apenas por probabilidade (decrescente).
     Para mesmas probabilidades, mantém a ordem original (estabilidade).
     
-    Implementação utilizando algoritmo de ordenação estável.
+    Implementação utilizando ordenação por baldes, em O(n + 101).
     """
-    # Usando o algoritmo de ordenação estável do Python (Timsort)
-    # Que mantém a ordem original para elementos com a mesma chave
-    return sorted(doencas, key=lambda doenca: -doenca.probabilidade_doenca)
+    return intercalar_baldes([agrupar_por_probabilidade(doencas)])
+
+
+def formatar_doenca(doenca: Doenca) -> str:
+    """Linha de saída de uma doença"""
+    return f"{doenca.codigo}->{doenca.probabilidade_doenca}%\n"
 
 
 def escrever_arquivo(nome_arquivo_saida: str, doencas: List[Doenca]):
     """Escreve resultados em uma única operação"""
     with open(nome_arquivo_saida, "w") as arquivo:
-        arquivo.writelines(f"{doenca.codigo}->{doenca.probabilidade_doenca}%\n" for doenca in doencas)
+        arquivo.writelines(map(formatar_doenca, doencas))
+
+
+class OrdenacaoExterna:
+    """
+    Ordenação estável em memória externa para painéis maiores que a RAM: cada balde de
+    probabilidade é um arquivo temporário ao qual as linhas de saída são anexadas na ordem de
+    chegada, e a saída final é a concatenação dos baldes do 100% ao 0%.
+    """
+
+    def __init__(self, diretorio: str):
+        self.caminhos = [os.path.join(diretorio, f"balde_{indice:03d}.txt") for indice in range(PROBABILIDADE_MAXIMA + 1)]
+        self.arquivos = [None] * (PROBABILIDADE_MAXIMA + 1)
+
+    def adicionar(self, baldes: List[List[Doenca]]):
+        for indice, balde in enumerate(baldes):
+            if not balde:
+                continue
+            if self.arquivos[indice] is None:
+                self.arquivos[indice] = open(self.caminhos[indice], "w")
+            self.arquivos[indice].writelines(map(formatar_doenca, balde))
+
+    def escrever(self, nome_arquivo_saida: str):
+        with open(nome_arquivo_saida, "w") as saida:
+            for arquivo, caminho in zip(self.arquivos, self.caminhos):
+                if arquivo is None:
+                    continue
+                arquivo.close()
+                with open(caminho, "r") as balde:
+                    shutil.copyfileobj(balde, saida)
+
+
+def dividir_por_custo(lista, custos, n):
+    """
+    Divide uma lista em até n partes contíguas de custo total aproximadamente igual.
+    As partes mantêm a ordem original, o que preserva a estabilidade da ordenação final.
+    """
+    total = sum(custos)
+    partes, parte, acumulado = [], [], 0
+    for item, custo in zip(lista, custos):
+        parte.append(item)
+        acumulado += custo
+        if len(partes) < n - 1 and acumulado * n >= total * (len(partes) + 1):
+            partes.append(parte)
+            parte = []
+    if parte:
+        partes.append(parte)
+    return partes
+
+
+def executar_medindo(argumentos):
+    """
+    Executa uma tarefa no trabalhador e devolve o trabalhador (pid e thread) e o tempo ocupado
+    junto do resultado
+    """
+    funcao, dados = argumentos
+    inicio = time.perf_counter()
+    resultado = funcao(dados)
+    return (os.getpid(), threading.get_ident()), time.perf_counter() - inicio, resultado
+
+
+class ExecucaoSerial:
+    """Execução no próprio processo, com a interface do pool usada aqui, para trabalhos pequenos"""
+
+    def __init__(self, inicializador=None, argumentos_inicializador=()):
+        if inicializador is not None:
+            inicializador(*argumentos_inicializador)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excecao):
+        return False
+
+    def imap(self, funcao, iteravel):
+        return map(funcao, iteravel)
+
+    imap_unordered = imap
+
+    def apply(self, funcao, argumentos=()):
+        return funcao(*argumentos)
+
+
+def estimar_trabalho(tamanho_dna: int, bytes_painel: int, distribuido: bool) -> float:
+    """Trabalho paralelizável estimado, em segundos de um núcleo: pontuação e, se distribuída, a busca"""
+    trabalho = bytes_painel * SEGUNDOS_POR_BYTE_PONTUACAO
+    if distribuido:
+        trabalho += bytes_painel * tamanho_dna * SEGUNDOS_POR_BYTE_BUSCA
+    return trabalho
+
+
+def gil_ativo() -> bool:
+    """Se o interpretador tem GIL (sempre, antes do CPython 3.13; nos builds free-threaded, só se reativado)"""
+    return getattr(sys, "_is_gil_enabled", lambda: True)()
+
+
+def aceleracao_threads(trabalhadores: int) -> float:
+    """Sob o GIL, threads não executam código Python em paralelo; sem ele, escalam como processos"""
+    return 1 if gil_ativo() else trabalhadores
+
+
+def execucao_paralela() -> str:
+    """
+    Execução padrão dos modos sempre paralelos (vários pacientes e servidor): threads quando
+    não há GIL, que compartilham o painel e a sequência sem cópia, e processos caso contrário
+    """
+    return "processos" if gil_ativo() else "threads"
+
+
+def estimar_tempo(execucao: str, trabalhadores: int, trabalho: float, bytes_painel: int) -> float:
+    """Tempo estimado de uma forma de execução com o número de trabalhadores dado"""
+    if execucao == "serial":
+        return trabalho
+    if execucao == "threads":
+        return CUSTO_POR_THREAD * trabalhadores + trabalho / aceleracao_threads(trabalhadores)
+    return CUSTO_POOL_PROCESSOS + CUSTO_POR_PROCESSO * trabalhadores + trabalho / trabalhadores + \
+        SEGUNDOS_POR_BYTE_TRANSFERENCIA * bytes_painel * trabalhadores
+
+
+def escolher_execucao(trabalho: float, bytes_painel: int, numero_nucleos: int,
+                      execucao: str = None, trabalhadores: int = None) -> Tuple[str, int]:
+    """
+    Forma de execução (serial, threads ou processos) e número de trabalhadores de menor tempo
+    estimado. Com uma execução ou um número de trabalhadores impostos, escolhe apenas o restante;
+    mais de um trabalhador imposto exclui a execução serial.
+    """
+    opcoes_trabalhadores = (trabalhadores,) if trabalhadores else range(1, numero_nucleos + 1)
+    execucoes = EXECUCOES if execucao is None else (execucao,)
+    if trabalhadores and trabalhadores > 1:
+        execucoes = [candidata for candidata in execucoes if candidata != "serial"]
+    candidatos = [
+        (candidata, quantidade)
+        for candidata in execucoes
+        for quantidade in (opcoes_trabalhadores if candidata != "serial" else (1,))
+    ]
+    return min(candidatos, key=lambda candidato: estimar_tempo(*candidato, trabalho, bytes_painel))
+
+
+def criar_execucao(execucao: str, trabalhadores: int, inicializador, argumentos_inicializador):
+    """Pool da forma de execução escolhida, com a mesma interface nas três formas"""
+    if execucao == "serial":
+        return ExecucaoSerial(inicializador, argumentos_inicializador)
+    if execucao == "threads":
+        return ThreadPool(trabalhadores, inicializador, argumentos_inicializador)
+    return multiprocessing.Pool(trabalhadores, inicializador, argumentos_inicializador)
+
+
+def razao_desbalanceamento(ocupacao: Dict[tuple, float], numero_trabalhadores: int) -> float:
+    """Tempo ocupado do trabalhador mais carregado dividido pela média (1.0 = carga perfeita)"""
+    total = sum(ocupacao.values())
+    if not total:
+        return 1.0
+    return max(ocupacao.values()) * numero_trabalhadores / total
+
+
+def buscar_genes_distribuido(pool, genes_unicos: List[str], numero_partes: int, ocupacao: Dict[tuple, float]) -> Set[str]:
+    """
+    Busca os genes únicos nos trabalhadores, em partes pequenas de custo equilibrado (tamanho dos
+    genes) entregues conforme os núcleos ficam livres.
+    """
+    grupos_genes = dividir_por_custo(genes_unicos, [len(gene) for gene in genes_unicos], numero_partes)
+    genes_presentes = set()
+    tarefas = [(avaliar_grupo_genes, grupo) for grupo in grupos_genes]
+    for trabalhador, tempo, presentes in pool.imap_unordered(executar_medindo, tarefas):
+        ocupacao[trabalhador] = ocupacao.get(trabalhador, 0) + tempo
+        genes_presentes |= presentes
+    return genes_presentes
+
+
+def pontuar_doencas(pool, linhas_doencas: List[str], genes_presentes: Set[str], numero_partes: int,
+                    limite: int, ocupacao: Dict[tuple, float]) -> Iterator[List[List[Doenca]]]:
+    """Calcula as probabilidades nos trabalhadores e devolve os baldes de cada grupo, na ordem original"""
+    # Divide a lista de doenças em chunks de custo equilibrado (genes × tamanho dos genes,
+    # aproximado pelo tamanho da linha), um para cada núcleo
+    grupos_doencas = dividir_por_custo(linhas_doencas, [len(linha) for linha in linhas_doencas], numero_partes)
+
+    # Prepara argumentos para processamento paralelo - cada núcleo recebe um grupo completo
+    argumentos_processamento = [
+        (processar_grupo_doencas, (grupo, genes_presentes, limite)) for grupo in grupos_doencas
+    ]
+
+    # Cada núcleo processa um grupo inteiro de doenças
+    for trabalhador, tempo, grupo in pool.imap(executar_medindo, argumentos_processamento):
+        ocupacao[trabalhador] = ocupacao.get(trabalhador, 0) + tempo
+        yield grupo
+
+
+class Metricas:
+    """
+    Instrumentação da execução: tempo acumulado de cada fase, contagens de genes e doenças,
+    tempo ocupado de cada trabalhador e pico de memória, relatados em JSON por --metricas
+    """
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.fases: Dict[str, float] = {}
+        self.contagens: Dict[str, int] = {}
+
+    @contextmanager
+    def fase(self, nome: str):
+        """Soma ao tempo da fase a duração do bloco"""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.fases[nome] = self.fases.get(nome, 0) + time.perf_counter() - inicio
+
+    def medir_iteracao(self, nome: str, iteravel: Iterable) -> Iterator:
+        """Repassa os itens do iterável, somando à fase o tempo gasto para produzir cada um"""
+        iterador = iter(iteravel)
+        while True:
+            with self.fase(nome):
+                item = next(iterador, _FIM_ITERACAO)
+            if item is _FIM_ITERACAO:
+                return
+            yield item
+
+    def contar(self, nome: str, quantidade: int = 1):
+        self.contagens[nome] = self.contagens.get(nome, 0) + quantidade
+
+    def relatorio(self, ocupacao: Dict[tuple, float], **informacoes) -> dict:
+        """Relatório serializável em JSON, com as informações adicionais no nível de cima"""
+        return {
+            **informacoes,
+            "tempo_total": time.perf_counter() - self.inicio,
+            "fases": self.fases,
+            "contagens": self.contagens,
+            "ocupacao_trabalhadores": [
+                {"pid": pid, "thread": thread, "ocupado": tempo}
+                for (pid, thread), tempo in sorted(ocupacao.items())
+            ],
+            "pico_rss_kb": pico_memoria_kb(),
+        }
+
+
+_FIM_ITERACAO = object()
+
+
+def pico_memoria_kb():
+    """Pico de memória residente (RSS) do processo principal e dos trabalhadores já encerrados, em KiB"""
+    if resource is None:
+        return None
+    escala = 1024 if sys.platform == "darwin" else 1  # ru_maxrss vem em bytes no macOS
+    return {
+        "processo": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // escala,
+        "trabalhadores": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss // escala,
+    }
+
+
+def escrever_metricas(destino: str, metricas: dict):
+    """Grava as métricas em JSON no arquivo de destino ("-" para a saída padrão)"""
+    if destino == "-":
+        print(json.dumps(metricas, indent=2))
+        return
+    with open(destino, "w") as arquivo:
+        json.dump(metricas, arquivo, indent=2)
+        arquivo.write("\n")
+
+
+def ler_sequencia_paciente(caminho: str) -> Tuple[int, str]:
+    """
+    Lê o tamanho mínimo e a sequência de DNA de um paciente: só a sequência na primeira linha
+    (tamanho mínimo None, vale o do painel), ou o formato de entrada, com o tamanho mínimo na
+    primeira linha e a sequência na segunda
+    """
+    mapa = abrir_mapeamento(caminho)
+    inicio, fim, proxima = limites_linha(mapa, 0)
+    tamanho_minimo_substring = None
+    if mapa[inicio:fim].isdigit():
+        tamanho_minimo_substring = int(mapa[inicio:fim])
+        inicio, fim, _ = limites_linha(mapa, proxima)
+    return tamanho_minimo_substring, SequenciaMapeada(caminho, inicio, fim, mapa).decodificar()
+
+
+def inicializar_trabalhador_pacientes(painel, configuracao: dict):
+    """
+    Inicializador do pool no modo de vários pacientes: recebe o painel compilado uma vez por
+    processo, ou o caminho de um painel compilado em disco, que cada processo mapeia em memória
+    """
+    global _painel_compartilhado, _configuracao_pacientes
+    if isinstance(painel, str):
+        painel = PainelCompilado.carregar(painel, com_automato=configuracao["avaliar_genes"] is None)
+    _painel_compartilhado = painel
+    _configuracao_pacientes = configuracao
+
+
+def processar_paciente(argumentos) -> Tuple[str, float]:
+    """Avalia o DNA de um paciente contra o painel compartilhado e escreve a saída do paciente"""
+    caminho_dna, caminho_saida = argumentos
+    inicio = time.perf_counter()
+
+    # Também protege os trabalhos do servidor, que recebem caminhos arbitrários
+    if mesmo_arquivo(caminho_dna, caminho_saida):
+        raise ValueError(f"a saída {caminho_saida} sobrescreveria o próprio arquivo de DNA")
+
+    tamanho_minimo_substring, sequencia_dna = ler_sequencia_paciente(caminho_dna)
+    presentes = avaliar_painel(_painel_compartilhado, sequencia_dna, _configuracao_pacientes["avaliar_genes"],
+                               _configuracao_pacientes["diretorio_cache"], tamanho_minimo_substring)
+    doencas_ordenadas = ordenar_doencas(pontuar_painel(_painel_compartilhado, presentes))
+    if _configuracao_pacientes["top"] is not None:
+        doencas_ordenadas = doencas_ordenadas[:_configuracao_pacientes["top"]]
+    escrever_arquivo(caminho_saida, doencas_ordenadas)
+
+    return caminho_dna, time.perf_counter() - inicio
+
+
+def mesmo_arquivo(caminho_a: str, caminho_b: str) -> bool:
+    """Se os dois caminhos levam ao mesmo arquivo (mesmo caminho real ou o mesmo inode)"""
+    if os.path.realpath(caminho_a) == os.path.realpath(caminho_b):
+        return True
+    return os.path.exists(caminho_a) and os.path.exists(caminho_b) and os.path.samefile(caminho_a, caminho_b)
+
+
+def caminho_saida_paciente(diretorio_saida: str, caminho_dna: str) -> str:
+    """Arquivo de saída de um paciente: o nome do arquivo de DNA dentro do diretório de saída"""
+    return os.path.join(diretorio_saida, os.path.basename(caminho_dna))
+
+
+def selecionar_motor(argumentos):
+    """Função de avaliação do motor escolhido, com as opções do motor já aplicadas"""
+    avaliar_genes = MOTORES[argumentos.motor]
+    if argumentos.edicoes:
+        avaliar_genes = partial(avaliar_genes, edicoes_maximas=argumentos.edicoes)
+    return avaliar_genes
+
+
+def configuracao_pacientes(argumentos) -> dict:
+    """Configuração dos trabalhadores: sem função de avaliação, o autômato do painel é usado"""
+    usa_automato = argumentos.motor == "aho-corasick" and not argumentos.edicoes
+    return {
+        "avaliar_genes": None if usa_automato else selecionar_motor(argumentos),
+        "diretorio_cache": argumentos.cache,
+        "top": argumentos.top,
+    }
+
+
+def main_compilar_painel(argumentos):
+    """Compila o painel do arquivo de entrada em um artefato binário, reaproveitável com --painel"""
+    tempo_inicio = time.time()
+
+    tamanho_minimo_substring, _, linhas_doencas = ler_arquivo_em_fluxo(argumentos.entrada)
+    painel = compilar_painel(tamanho_minimo_substring, linhas_doencas)
+    painel.salvar(argumentos.saida)
+    print(f"Painel compilado: {len(painel.codigos)} doenças, {len(painel.genes)} genes únicos")
+
+    tempo_fim = time.time()
+    print(f"Tempo de execução: {tempo_fim - tempo_inicio:.6f} segundos")
+
+
+def main_painel(argumentos):
+    """
+    Avalia o DNA da entrada contra um painel já compilado, mapeado em memória. Se a entrada traz
+    o tamanho mínimo na primeira linha, ele prevalece sobre o gravado no painel.
+    """
+    tempo_inicio = time.time()
+
+    inicializar_trabalhador_pacientes(argumentos.painel, configuracao_pacientes(argumentos))
+    processar_paciente((argumentos.entrada, argumentos.saida))
+
+    tempo_fim = time.time()
+    print(f"Tempo de execução: {tempo_fim - tempo_inicio:.6f} segundos")
+
+
+def preparar_painel(argumentos, configuracao: dict, execucao: str):
+    """
+    Painel a ser entregue aos trabalhadores: o caminho do artefato de --painel (cada processo o
+    mapeia; threads e a execução serial recebem o artefato já carregado) ou o painel da entrada
+    compilado no processo principal
+    """
+    com_automato = configuracao["avaliar_genes"] is None
+    if argumentos.painel is not None:
+        if execucao != "processos":
+            return PainelCompilado.carregar(argumentos.painel, com_automato)
+        # Valida o artefato antes do pool: um inicializador que falha é recriado indefinidamente
+        PainelCompilado.carregar(argumentos.painel, com_automato=False)
+        return argumentos.painel
+    tamanho_minimo_substring, _, linhas_doencas = ler_arquivo_em_fluxo(argumentos.entrada)
+    return compilar_painel(tamanho_minimo_substring, linhas_doencas, com_automato)
+
+
+def main_pacientes(argumentos):
+    """
+    Modo de vários pacientes: o painel do arquivo de entrada é lido e compilado uma única vez
+    (genes únicos e autômato), e os arquivos de DNA dos pacientes passam por um pool de
+    trabalhadores (threads sem GIL, processos caso contrário, ou a execução de --execucao), cada
+    um gerando sua própria saída no diretório de saída. Com --painel, cada processo mapeia o painel já compilado em
+    vez de recebê-lo do processo principal.
+    """
+    tempo_inicio = time.time()
+
+    configuracao = configuracao_pacientes(argumentos)
+    execucao = argumentos.execucao or execucao_paralela()
+    painel = preparar_painel(argumentos, configuracao, execucao)
+
+    os.makedirs(argumentos.saida, exist_ok=True)
+    tarefas = [(caminho, caminho_saida_paciente(argumentos.saida, caminho)) for caminho in argumentos.pacientes]
+    numero_trabalhadores = min(argumentos.trabalhadores or multiprocessing.cpu_count(), len(tarefas))
+    with criar_execucao(execucao, numero_trabalhadores, inicializar_trabalhador_pacientes,
+                        (painel, configuracao)) as pool:
+        for caminho_dna, tempo in pool.imap_unordered(processar_paciente, tarefas):
+            print(f"{caminho_dna}: {tempo:.6f} segundos")
+
+    tempo_fim = time.time()
+    print(f"Tempo de execução: {tempo_fim - tempo_inicio:.6f} segundos")
+
+
+def inicializar_trabalhador_servidor(painel, configuracao: dict):
+    """Inicializador do pool do servidor: o Ctrl+C encerra só o processo principal, que fecha o pool"""
+    if multiprocessing.parent_process() is not None and threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGINT, signal.SIG_IGN)  # Processo trabalhador (threads não recebem sinais)
+    inicializar_trabalhador_pacientes(painel, configuracao)
+
+
+class ManipuladorTrabalhos(socketserver.StreamRequestHandler):
+    """
+    Atende uma conexão do servidor: cada linha é um trabalho em JSON com "entrada" (arquivo de
+    DNA) e "saida", respondido com uma linha JSON contendo "tempo" ou "erro"
+    """
+
+    def handle(self):
+        for linha in self.rfile:
+            try:
+                trabalho = json.loads(linha)
+                _, tempo = self.server.pool.apply(processar_paciente, ((trabalho["entrada"], trabalho["saida"]),))
+                resposta = {"tempo": tempo}
+            except Exception as erro:
+                resposta = {"erro": f"{type(erro).__name__}: {erro}"}
+            self.wfile.write(json.dumps(resposta).encode() + b"\n")
+            self.wfile.flush()
+
+
+class ServidorTrabalhos(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Servidor em socket Unix; as conexões são atendidas em threads e o trabalho vai para o pool"""
+    daemon_threads = True
+
+    def __init__(self, caminho_socket: str, pool):
+        self.pool = pool
+        super().__init__(caminho_socket, ManipuladorTrabalhos)
+
+
+def main_servidor(argumentos):
+    """
+    Modo servidor: o painel é compilado (ou mapeado, com --painel) e o pool de trabalhadores é
+    criado uma única vez. Os trabalhos chegam pelo socket Unix da saída e pagam apenas a
+    leitura do DNA e a correspondência. Com --cache, os índices da sequência dos motores que
+    os usam também são reaproveitados entre trabalhos.
+    """
+    configuracao = configuracao_pacientes(argumentos)
+    execucao = argumentos.execucao or execucao_paralela()
+    painel = preparar_painel(argumentos, configuracao, execucao)
+
+    caminho_socket = argumentos.saida
+    if os.path.exists(caminho_socket) and stat.S_ISSOCK(os.stat(caminho_socket).st_mode):
+        os.unlink(caminho_socket)  # Socket deixado por um servidor anterior
+
+    numero_trabalhadores = argumentos.trabalhadores or multiprocessing.cpu_count()
+    with criar_execucao(execucao, numero_trabalhadores, inicializar_trabalhador_servidor,
+                        (painel, configuracao)) as pool, \
+            ServidorTrabalhos(caminho_socket, pool) as servidor:
+        print(f"Servidor aguardando trabalhos em {caminho_socket}")
+        try:
+            servidor.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.unlink(caminho_socket)
+
+
+def enviar_trabalho(caminho_socket: str, caminho_dna: str, caminho_saida: str) -> dict:
+    """Envia um trabalho ao servidor e devolve a resposta"""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conexao:
+        conexao.connect(caminho_socket)
+        with conexao.makefile("rwb") as arquivo:
+            trabalho = {"entrada": os.path.abspath(caminho_dna), "saida": os.path.abspath(caminho_saida)}
+            arquivo.write(json.dumps(trabalho).encode() + b"\n")
+            arquivo.flush()
+            return json.loads(arquivo.readline())
 
 
-def dividir_lista(lista, n):
-    """Divide uma lista em n partes aproximadamente iguais"""
-    k, m = divmod(len(lista), n)
-    return [lista[i * k + min(i, m):(i + 1) * k + min(i + 1, m)] for i in range(n)]
+def main_cliente(argumentos):
+    """Submete o DNA da entrada a um servidor em execução, que escreve a saída"""
+    tempo_inicio = time.time()
+
+    resposta = enviar_trabalho(argumentos.cliente, argumentos.entrada, argumentos.saida)
+    if "erro" in resposta:
+        sys.exit(f"Erro do servidor: {resposta['erro']}")
+    print(f"Tempo no servidor: {resposta['tempo']:.6f} segundos")
+
+    tempo_fim = time.time()
+    print(f"Tempo de execução: {tempo_fim - tempo_inicio:.6f} segundos")
+
+
+def ler_argumentos():
+    """Interpreta a linha de comando"""
+    parser = argparse.ArgumentParser(description="Sequenciamento de DNA e cálculo de probabilidade de doenças")
+    parser.add_argument("entrada", help="arquivo de entrada (com --pacientes, o arquivo do painel; "
+                                         "com --painel, o arquivo com o DNA)")
+    parser.add_argument("saida", help="arquivo de saída (com --pacientes, o diretório de saída; "
+                                      "com --compilar-painel, o painel compilado; com --servidor, o socket)")
+    parser.add_argument("--motor", choices=sorted(MOTORES), default="aho-corasick",
+                        help="motor de correspondência de genes (padrão: aho-corasick)")
+    parser.add_argument("--edicoes", type=int, default=0, metavar="E",
+                        help="com --motor bitparalelo, aceita ocorrências a até E edições do gene (Myers)")
+    parser.add_argument("--cache", metavar="DIRETORIO",
+                        help="diretório para reutilizar índices do DNA entre execuções")
+    parser.add_argument("--top", type=int, metavar="K",
+                        help="escreve apenas as K doenças mais prováveis")
+    parser.add_argument("--cobertura", metavar="ARQUIVO",
+                        help="escreve a fração de cada gene coberta por trechos de pelo menos "
+                             "tamanho_minimo_substring bases presentes no DNA")
+    parser.add_argument("--lote", type=int, metavar="N",
+                        help="lê e processa as doenças em lotes de N linhas, com memória limitada")
+    parser.add_argument("--pacientes", nargs="+", metavar="ARQUIVO_DNA",
+                        help="avalia vários pacientes contra o painel da entrada, uma saída por paciente")
+    parser.add_argument("--compilar-painel", action="store_true",
+                        help="compila o painel da entrada em um artefato binário gravado na saída")
+    parser.add_argument("--painel", metavar="ARTEFATO",
+                        help="usa um painel compilado por --compilar-painel no lugar das doenças da entrada")
+    parser.add_argument("--execucao", choices=EXECUCOES,
+                        help="impõe a forma de execução em vez da escolhida pelo modelo de custo")
+    parser.add_argument("--trabalhadores", type=int, metavar="N",
+                        help="impõe o número de trabalhadores em vez do escolhido pelo modelo de custo")
+    parser.add_argument("--metricas", "--metrics", metavar="ARQUIVO",
+                        help="grava em JSON o tempo de cada fase, contagens, ocupação dos trabalhadores e "
+                             "pico de memória (\"-\" para a saída padrão)")
+    parser.add_argument("--servidor", action="store_true",
+                        help="mantém o painel e o pool de processos ativos, recebendo trabalhos no socket da saída")
+    parser.add_argument("--cliente", metavar="SOCKET",
+                        help="envia o DNA da entrada ao servidor em SOCKET, que escreve a saída")
+    argumentos = parser.parse_args()
+    modos = [argumentos.compilar_painel, argumentos.pacientes, argumentos.servidor, argumentos.cliente]
+    if sum(1 for modo in modos if modo) > 1:
+        parser.error("--compilar-painel, --pacientes, --servidor e --cliente são mutuamente exclusivos")
+    if (any(modos) or argumentos.painel) and (argumentos.lote or argumentos.cobertura):
+        parser.error("--lote e --cobertura não são aceitos com painel compilado, vários pacientes ou servidor")
+    if argumentos.compilar_painel and argumentos.painel:
+        parser.error("--compilar-painel não aceita --painel")
+    if (any(modos) or argumentos.painel) and argumentos.metricas:
+        parser.error("--metricas não é aceito com painel compilado, vários pacientes ou servidor")
+    if argumentos.execucao and (argumentos.compilar_painel or argumentos.cliente or
+                                (argumentos.painel and not (argumentos.pacientes or argumentos.servidor))):
+        parser.error("--execucao não é aceito com --compilar-painel, --cliente ou --painel de um único DNA")
+    if argumentos.trabalhadores and (argumentos.compilar_painel or argumentos.cliente or
+                                     (argumentos.painel and not (argumentos.pacientes or argumentos.servidor))):
+        parser.error("--trabalhadores não é aceito com --compilar-painel, --cliente ou --painel de um único DNA")
+    if argumentos.top is not None and argumentos.top < 1:
+        parser.error("--top deve ser maior que zero")
+    if argumentos.motor == "numpy" and np is None:
+        parser.error("o motor numpy requer o pacote numpy")
+    if argumentos.edicoes < 0:
+        parser.error("--edicoes não pode ser negativo")
+    if argumentos.edicoes and argumentos.motor != "bitparalelo":
+        parser.error("--edicoes só é aceito com --motor bitparalelo")
+    if argumentos.lote is not None and argumentos.lote < 1:
+        parser.error("--lote deve ser maior que zero")
+    if argumentos.trabalhadores is not None and argumentos.trabalhadores < 1:
+        parser.error("--trabalhadores deve ser maior que zero")
+    if argumentos.execucao == "serial" and argumentos.trabalhadores and argumentos.trabalhadores > 1:
+        parser.error("--execucao serial usa um único trabalhador")
+    if argumentos.pacientes:
+        # Cada paciente escreve no diretório de saída com o nome do seu arquivo de DNA: nomes
+        # repetidos se sobrescreveriam, e a saída não pode ser o próprio arquivo de DNA
+        nomes = [os.path.basename(caminho) for caminho in argumentos.pacientes]
+        repetidos = sorted({nome for nome in nomes if nomes.count(nome) > 1})
+        if repetidos:
+            parser.error(f"arquivos de pacientes com o mesmo nome: {', '.join(repetidos)}")
+        for caminho in argumentos.pacientes:
+            if mesmo_arquivo(caminho, caminho_saida_paciente(argumentos.saida, caminho)):
+                parser.error(f"a saída de {caminho} sobrescreveria o próprio arquivo de DNA")
+    elif argumentos.painel and not (argumentos.servidor or argumentos.cliente) and \
+            mesmo_arquivo(argumentos.entrada, argumentos.saida):
+        parser.error("a saída sobrescreveria o próprio arquivo de DNA")
+    return argumentos
 
 
 def main():
-    nome_arquivo_entrada = sys.argv[1]
-    nome_arquivo_saida = sys.argv[2]
+    argumentos = ler_argumentos()
+    if argumentos.compilar_painel:
+        main_compilar_painel(argumentos)
+        return
+    if argumentos.pacientes:
+        main_pacientes(argumentos)
+        return
+    if argumentos.servidor:
+        main_servidor(argumentos)
+        return
+    if argumentos.cliente:
+        main_cliente(argumentos)
+        return
+    if argumentos.painel:
+        main_painel(argumentos)
+        return
+
+    nome_arquivo_entrada = argumentos.entrada
+    nome_arquivo_saida = argumentos.saida
 
     # Medição de tempo
     tempo_inicio = time.time()
@@ -124,32 +2191,136 @@ def main():
     # Obtém o número de núcleos de CPU disponíveis
     numero_nucleos = multiprocessing.cpu_count()
     
-    # Lê dados do arquivo
-    tamanho_minimo_substring, sequencia_dna, linhas_doencas = ler_arquivo(nome_arquivo_entrada)
-    
-    # Divide a lista de doenças em chunks, um para cada núcleo
-    grupos_doencas = dividir_lista(linhas_doencas, numero_nucleos)
-    
-    # Prepara argumentos para processamento paralelo - cada núcleo recebe um grupo completo
-    argumentos_processamento = [(grupo, sequencia_dna, tamanho_minimo_substring) for grupo in grupos_doencas]
-    
-    # Usa pool de processos para paralelismo verdadeiro (evitando GIL)
-    with multiprocessing.Pool(processes=numero_nucleos) as pool:
-        # Cada núcleo processa um grupo inteiro de doenças
-        resultados = pool.map(processar_grupo_doencas, argumentos_processamento)
-    
-    # Combina os resultados de todos os núcleos
-    doencas = [doenca for grupo in resultados for doenca in grupo]
-    
-    # Ordena doenças
-    doencas_ordenadas = ordenar_doencas(doencas)
+    # Tempo de cada fase, contagens e ocupação dos trabalhadores, para --metricas. Com as métricas
+    # na saída padrão, o relatório legível vai para a saída de erro e a saída padrão fica só com o JSON
+    metricas = Metricas()
+    relatorio = sys.stderr if argumentos.metricas == "-" else sys.stdout
+
+    # Lê o cabeçalho do arquivo mapeado; as linhas de doenças são lidas sob demanda
+    with metricas.fase("leitura"):
+        tamanho_minimo_substring, sequencia_mapeada, linhas_doencas = ler_arquivo_em_fluxo(nome_arquivo_entrada)
 
-    # Escreve resultados
-    escrever_arquivo(nome_arquivo_saida, doencas_ordenadas)
+    # Entradas pequenas não pagam a criação de um pool: o modelo de custo escolhe a execução
+    # a partir do tamanho do DNA e do painel, conhecidos antes de ler as doenças
+    bytes_painel = len(sequencia_mapeada.mapa) - sequencia_mapeada.fim
+    trabalho = estimar_trabalho(len(sequencia_mapeada), bytes_painel, argumentos.motor in MOTORES_DISTRIBUIDOS)
+    execucao, numero_trabalhadores = escolher_execucao(trabalho, bytes_painel, numero_nucleos,
+                                                       argumentos.execucao, argumentos.trabalhadores)
+    print(f"Execução: {execucao} com {numero_trabalhadores} trabalhador(es) "
+          f"(trabalho estimado: {trabalho:.6f} segundos)", file=relatorio)
+
+    if argumentos.motor in MOTORES_DISTRIBUIDOS:
+        # A busca roda nos trabalhadores, que mapeiam o trecho da sequência no próprio arquivo de
+        # entrada: nenhuma cópia da sequência é feita
+        origem_sequencia = (sequencia_mapeada.caminho, sequencia_mapeada.inicio, sequencia_mapeada.fim)
+        sequencia_dna = None
+    elif argumentos.motor in MOTORES_MAPEADOS:
+        origem_sequencia = None
+        sequencia_dna = sequencia_mapeada
+    else:
+        origem_sequencia = None
+        with metricas.fase("leitura"):
+            sequencia_dna = sequencia_mapeada.decodificar()
+
+    # Sem --lote, o painel inteiro forma um único lote e a deduplicação vale para todo o painel
+    if argumentos.lote:
+        lotes = agrupar_em_lotes(linhas_doencas, argumentos.lote)
+    else:
+        lotes = [list(linhas_doencas)]
+
+    avaliar_genes = selecionar_motor(argumentos)
+
+    indice = None
+    automato_cobertura = None
+    genes_duplicados = 0
+    # Tempo ocupado de cada trabalhador, para medir o desbalanceamento de carga
+    ocupacao = {}
+    resultados = []
+
+    with tempfile.TemporaryDirectory() as diretorio_temporario, \
+            open(argumentos.cobertura if argumentos.cobertura else os.devnull, "w") as arquivo_cobertura:
+        # Destino dos resultados: seleção top-K, ordenação externa em lotes ou baldes em memória
+        selecao = SelecaoTopK(argumentos.top) if argumentos.top is not None else None
+        ordenacao_externa = OrdenacaoExterna(diretorio_temporario) if argumentos.lote and selecao is None else None
+
+        # Pool de processos para paralelismo verdadeiro (evitando GIL), threads ou serial
+        if execucao != "processos" and origem_sequencia is not None:
+            origem_sequencia = sequencia_mapeada
+        with metricas.fase("despacho"):
+            pool = criar_execucao(execucao, numero_trabalhadores, inicializar_trabalhador,
+                                  (origem_sequencia, tamanho_minimo_substring))
+        with pool:
+            # As linhas de cada lote são lidas e interpretadas sob demanda
+            for lote in metricas.medir_iteracao("interpretacao", lotes):
+                # Cada gene é avaliado uma única vez, e o veredicto vale para todas as doenças do lote
+                with metricas.fase("interpretacao"):
+                    genes_unicos, duplicados = deduplicar_genes(lote)
+                genes_duplicados += duplicados
+                metricas.contar("lotes")
+                metricas.contar("doencas", len(lote))
+                metricas.contar("genes_unicos", len(genes_unicos))
+                metricas.contar("genes_duplicados", duplicados)
+
+                # Índice do DNA construído no primeiro lote e reaproveitado pelos seguintes
+                if indice is None:
+                    with metricas.fase("indice"):
+                        indice = preparar_indice(argumentos.motor, sequencia_dna, argumentos.cache, genes_unicos)
+
+                with metricas.fase("correspondencia"):
+                    if origem_sequencia is not None:
+                        genes_presentes = buscar_genes_distribuido(pool, genes_unicos,
+                                                                   numero_trabalhadores * PARTES_POR_TRABALHADOR,
+                                                                   ocupacao)
+                    else:
+                        # Avalia todos os genes do lote de uma vez com o motor escolhido
+                        genes_presentes = avaliar_genes(sequencia_dna, genes_unicos, tamanho_minimo_substring,
+                                                        argumentos.cache, indice)
+                metricas.contar("genes_presentes", len(genes_presentes))
+
+                if argumentos.cobertura:
+                    with metricas.fase("cobertura"):
+                        if automato_cobertura is None:
+                            automato_cobertura = indice if isinstance(indice, AutomatoSufixos) else \
+                                AutomatoSufixos(sequencia_dna if isinstance(sequencia_dna, str)
+                                                else sequencia_mapeada.decodificar())
+                        escrever_cobertura(arquivo_cobertura, automato_cobertura, genes_unicos,
+                                           tamanho_minimo_substring)
+
+                # Os grupos passam pela seleção ou pela ordenação externa assim que chegam
+                with metricas.fase("intercalacao"):
+                    for grupo in pontuar_doencas(pool, lote, genes_presentes, numero_trabalhadores, argumentos.top,
+                                                 ocupacao):
+                        if selecao is not None:
+                            selecao.adicionar(intercalar_baldes([grupo]))
+                        elif ordenacao_externa is not None:
+                            ordenacao_externa.adicionar(grupo)
+                        else:
+                            resultados.append(grupo)
+
+        print(f"Genes duplicados ignorados: {genes_duplicados}", file=relatorio)
+        print(f"Desbalanceamento de carga: {razao_desbalanceamento(ocupacao, numero_trabalhadores):.2f}",
+              file=relatorio)
+
+        # Escreve resultados
+        if ordenacao_externa is not None:
+            # Os baldes já estão nos arquivos: só resta concatená-los
+            with metricas.fase("escrita"):
+                ordenacao_externa.escrever(nome_arquivo_saida)
+        else:
+            with metricas.fase("ordenacao"):
+                # Combina os baldes de todos os núcleos, já na ordem final
+                doencas_ordenadas = selecao.resultado() if selecao is not None else intercalar_baldes(resultados)
+            with metricas.fase("escrita"):
+                escrever_arquivo(nome_arquivo_saida, doencas_ordenadas)
 
     # Tempo de execução
     tempo_fim = time.time()
-    print(f"Tempo de execução: {tempo_fim - tempo_inicio:.6f} segundos")
+    print(f"Tempo de execução: {tempo_fim - tempo_inicio:.6f} segundos", file=relatorio)
+
+    if argumentos.metricas:
+        escrever_metricas(argumentos.metricas, metricas.relatorio(
+            ocupacao, motor=argumentos.motor, execucao=execucao, trabalhadores=numero_trabalhadores,
+            trabalho_estimado=trabalho, desbalanceamento=razao_desbalanceamento(ocupacao, numero_trabalhadores)))
 
 
 if __name__ == "__main__":